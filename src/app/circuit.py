@@ -0,0 +1,231 @@
+from __future__ import annotations
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from src.providers.base import BlockedError
+from src.utils.logging import log
+from src.utils.metrics import METRICS
+
+T = TypeVar("T")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """차단으로 공급자가 쉬는 중 → 브라우저를 띄우지 않고 바로 건너뜀"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} 차단 대기 중 (약 {int(retry_in // 60) + 1}분 후 재시도)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+@dataclass
+class _State:
+    state: str = CLOSED
+    failures: int = 0         # 연속 실패 (차단 아닌 오류)
+    trips: int = 0            # 연속으로 열린 횟수 → 대기 시간 2배씩
+    open_until: float = 0.0
+    reason: str = ""
+    probe_until: float = 0.0  # half_open 시험 쿼리를 누가 들고 있으면 이때까지 다른 프로세스는 대기
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """프로세스 간 배타 잠금 (봇 / run_once / watch가 같은 상태 파일을 고침)"""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CircuitBreaker:
+    """
+    공급자별 차단 회로 (closed → open → half_open → closed).
+    - BlockedError는 바로 open, 그 밖의 오류는 failure_threshold번 연속이면 open
+    - open 동안은 해당 공급자 쿼리를 바로 건너뜀 (cooldown = base x 2^(trips-1), 최대 max_cooldown)
+    - cooldown이 지나면 half_open: 쿼리 하나만 시험으로 보내고, 성공하면 closed / 실패하면 더 길게 open
+    - 상태는 JSON 파일에 저장 → run_once 다음 실행과 봇이 같이 본다
+    - 고칠 때는 파일 잠금 안에서 다시 읽고 그 공급자 항목만 바꿔 씀 (다른 프로세스가 쓴 상태를 덮지 않게)
+    - 시험 쿼리는 probe_ttl 동안 한 프로세스만 (그 프로세스가 죽으면 ttl 뒤 다른 프로세스가 시험)
+    """
+
+    def __init__(
+        self,
+        path: str = "data/circuit.json",
+        base_cooldown: float = 900,
+        max_cooldown: float = 6 * 3600,
+        failure_threshold: int = 3,
+        probe_ttl: float = 600,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+        self.probe_ttl = probe_ttl
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.failure_threshold = max(1, failure_threshold)
+        self._states: Dict[str, _State] = {}
+        self._mtime = 0.0
+        self._probing: set[str] = set()  # 이 프로세스에서 시험 쿼리가 나가 있는 공급자
+        self._load()
+
+    # ---- 저장 ----
+    def _load(self, force: bool = False) -> None:
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime and not force:
+            return
+        try:
+            data: Dict[str, Any] = json.loads(self.path.read_text(encoding="utf-8-sig"))
+        except (OSError, ValueError):
+            return
+        self._states = {k: _State(**v) for k, v in data.items()}
+        self._mtime = mtime
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({k: asdict(v) for k, v in self._states.items()}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+        self._mtime = self.path.stat().st_mtime
+
+    def _get(self, provider: str) -> _State:
+        return self._states.setdefault(provider, _State())
+
+    @contextmanager
+    def _update(self, provider: str) -> Iterator[_State]:
+        """잠금 → 파일에서 다시 읽기 → 이 공급자 상태만 고치기 → 저장"""
+        with _file_lock(self._lock_path):
+            self._load(force=True)
+            st = self._get(provider)
+            yield st
+            self._save()
+
+    # ---- 조회 ----
+    def state(self, provider: str) -> str:
+        self._load()
+        return self._get(provider).state
+
+    def retry_in(self, provider: str) -> float:
+        return max(0.0, self._get(provider).open_until - time.time())
+
+    def allow(self, provider: str) -> bool:
+        """지금 이 공급자에 쿼리를 보내도 되는지. half_open이면 (모든 프로세스 합쳐) 처음 한 번만 True"""
+        self._load()
+        st = self._get(provider)
+        if st.state == CLOSED:
+            return True
+        if provider in self._probing:
+            return False
+        now = time.time()
+        if (st.state == OPEN and now < st.open_until) or (st.state == HALF_OPEN and now < st.probe_until):
+            return False
+
+        # cooldown 끝 (또는 시험하던 프로세스가 ttl 안에 안 끝낸 half_open) → 잠금 안에서 다시 확인하고 시험권 가져가기
+        with self._update(provider) as st:
+            if st.state == CLOSED:
+                return True
+            if (st.state == OPEN and now < st.open_until) or (st.state == HALF_OPEN and now < st.probe_until):
+                return False
+            st.state = HALF_OPEN
+            st.probe_until = now + self.probe_ttl
+        self._probing.add(provider)
+        log(f"[{provider}] circuit half-open: 시험 쿼리 1건")
+        return True
+
+    # ---- 결과 기록 ----
+    def record_success(self, provider: str) -> None:
+        probing = provider in self._probing
+        self._probing.discard(provider)
+        self._load()
+        st = self._get(provider)
+        if st.state == CLOSED and not st.failures and not st.trips:
+            return
+        with self._update(provider) as st:
+            # 열린/시험 중인 회로는 시험 쿼리 성공으로만 닫음
+            # (다른 프로세스가 방금 연 회로를 그 전에 시작한 쿼리 성공으로 닫지 않게)
+            if st.state != CLOSED and not probing:
+                return
+            if st.state != CLOSED:
+                log(f"[{provider}] circuit closed (복구)")
+            self._states[provider] = _State()
+
+    def record_failure(self, provider: str, blocked: bool, reason: str = "") -> None:
+        probing = provider in self._probing
+        self._probing.discard(provider)
+        with self._update(provider) as st:
+            if st.state == OPEN and not probing:
+                # 이미 (다른 프로세스가) 열어둠 → 대기 시간을 또 늘리지 않음
+                return
+            st.failures += 1
+            st.reason = reason
+            if blocked or st.state == HALF_OPEN or st.failures >= self.failure_threshold:
+                st.trips += 1
+                cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (st.trips - 1))
+                st.state = OPEN
+                st.open_until = time.time() + cooldown
+                st.failures = 0
+                st.probe_until = 0.0
+                METRICS.inc("circuit_open_total", provider=provider)
+                log(f"[{provider}] circuit open {int(cooldown // 60)}분 ({reason})")
+
+    def release(self, provider: str) -> None:
+        """시험 쿼리가 결과 없이 취소됨 → 다음 호출(다른 프로세스 포함)이 다시 시험할 수 있게"""
+        if provider not in self._probing:
+            return
+        self._probing.discard(provider)
+        with self._update(provider) as st:
+            if st.state == HALF_OPEN:
+                st.probe_until = 0.0
+
+    async def call(self, provider: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """allow 확인 → 실행 → 결과 기록. 열려 있으면 CircuitOpenError"""
+        if not self.allow(provider):
+            METRICS.inc("circuit_skipped_total", provider=provider)
+            raise CircuitOpenError(provider, self.retry_in(provider))
+        try:
+            out = await fn()
+        except BlockedError as e:
+            self.record_failure(provider, blocked=True, reason=e.reason)
+            raise
+        except Exception as e:
+            self.record_failure(provider, blocked=False, reason=type(e).__name__)
+            raise
+        except BaseException:
+            self.release(provider)
+            raise
+        self.record_success(provider)
+        return out
+
+    def status_text(self) -> str:
+        self._load()
+        lines = []
+        for name, st in sorted(self._states.items()):
+            extra = ""
+            if st.state == OPEN:
+                extra = f" ({int(self.retry_in(name) // 60)}분 남음, {st.reason})"
+            lines.append(f"{name}: {st.state}{extra}")
+        return "\n".join(lines) or "모두 정상"
@@ -1,6 +1,10 @@
 ﻿from __future__ import annotations
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from src.providers.base import Listing
 
+_SPARK = "▁▂▃▄▅▆▇█"
+
 def format_msg(x: Listing) -> str:
     price = "-" if x.price_total is None else f"₩{x.price_total:,}"
     rating = "-" if x.rating is None else f"{x.rating}"
@@ -15,3 +19,77 @@ def format_msg(x: Listing) -> str:
         f"🧾 {cancel}{loc}\n"
         f"🔗 {x.url}"
     )
+
+def format_drop_msg(x: Listing, prev: int) -> str:
+    cur = x.price_total or 0
+    pct = (prev - cur) * 100 / prev if prev else 0
+    return (
+        f"📉 가격 하락 ₩{prev:,} → ₩{cur:,} (-{pct:.0f}%)\n"
+        + format_msg(x)
+    )
+
+def sparkline(values: List[int]) -> str:
+    if not values:
+        return ""
+    lo, hi = min(values), max(values)
+    span = (hi - lo) or 1
+    return "".join(_SPARK[(v - lo) * (len(_SPARK) - 1) // span] for v in values)
+
+def format_history(
+    title: str,
+    checkin: str,
+    checkout: str,
+    points: List[Tuple[int, int]],
+    url: Optional[str] = None,
+) -> str:
+    if not points:
+        return f"🏨 {title}\n기록 없음"
+    prices = [p for _, p in points]
+    first = datetime.fromtimestamp(points[0][0]).strftime("%m-%d")
+    last = datetime.fromtimestamp(points[-1][0]).strftime("%m-%d %H:%M")
+    link = f"\n🔗 {url}" if url else ""
+    return (
+        f"🏨 {title}\n"
+        f"📅 {checkin} ~ {checkout}\n"
+        f"📈 {sparkline(prices)}\n"
+        f"최저 ₩{min(prices):,} / 최고 ₩{max(prices):,} / 최근 ₩{prices[-1]:,}\n"
+        f"({first} ~ {last}, {len(points)}구간){link}"
+    )
+
+def _man(price: Optional[int]) -> str:
+    """₩123,000 → 12.3만 (표 칸 폭을 줄이려고)"""
+    return "-" if price is None else f"{price / 10000:.1f}만"
+
+def _matrix(cells: Dict[Tuple[str, str], int], checkins: List[str], nights: List[int]) -> List[str]:
+    by_key = {
+        (ci, (datetime.fromisoformat(co) - datetime.fromisoformat(ci)).days): p
+        for (ci, co), p in cells.items()
+    }
+    lines = ["체크인  " + "".join(f"{n}박".rjust(8) for n in nights)]
+    for ci in checkins:
+        lines.append(ci[5:].ljust(7) + "".join(_man(by_key.get((ci, n))).rjust(8) for n in nights))
+    return lines
+
+def format_sweep(
+    title: str,
+    cells: List[Tuple[str, str]],
+    cheapest: Dict[Tuple[str, str], int],
+    hotels: List[Tuple[str, Dict[Tuple[str, str], int]]],
+) -> str:
+    """날짜 스윕 결과: 칸별 최저가 표 + 숙소별 표 (숙소는 최저가 순)"""
+    if not cheapest:
+        return f"🗓 {title}\n결과 없음"
+    checkins = sorted({ci for ci, _ in cells})
+    nights = sorted({(datetime.fromisoformat(co) - datetime.fromisoformat(ci)).days for ci, co in cells})
+
+    best_cell = min(cheapest, key=cheapest.get)
+    out = [
+        f"🗓 {title}",
+        f"💰 최저 ₩{cheapest[best_cell]:,} ({best_cell[0]} ~ {best_cell[1]})",
+        "",
+        *_matrix(cheapest, checkins, nights),
+    ]
+    for name, row in hotels:
+        cell = min(row, key=row.get)
+        out += ["", f"🏨 {name} (최저 ₩{row[cell]:,}, {cell[0][5:]}~{cell[1][5:]})", *_matrix(row, checkins, nights)]
+    return "\n".join(out)
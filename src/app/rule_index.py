@@ -0,0 +1,101 @@
+from __future__ import annotations
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.app.rules import Rules
+from src.providers.base import Listing
+
+
+@dataclass(frozen=True)
+class Subscription:
+    id: str
+    rules: Rules
+    chat_id: Optional[int] = None
+    meta: Any = None
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class RuleIndex:
+    """
+    여러 구독(Subscription)의 Rules를 미리 인덱스로 컴파일해서
+    Listing 하나에 맞는 구독들을 구독 수에 선형이 아닌 시간으로 찾는다.
+
+    - 가격: 모든 [min, max] 구간의 경계값으로 나눈 기본 구간마다 "이 구간을 덮는 구독" 비트마스크
+            → bisect 한 번 + 마스크 조회
+    - 평점: min_rating 오름차순 누적 마스크 → bisect 한 번
+    - 무료취소: require_free_cancel 구독 마스크
+    세 마스크를 AND 한 뒤 켜진 비트만 구독으로 되돌린다.
+
+    None 처리는 match_rules와 동일:
+    가격/평점이 None이면 그 조건은 통과, free_cancel이 False일 때만 무료취소 조건에 걸린다.
+    """
+
+    def __init__(self, subs: Iterable[Subscription]):
+        self.subs: List[Subscription] = list(subs)
+        n = len(self.subs)
+        self._all = (1 << n) - 1
+
+        # ---- 가격 구간 (정수 가격이므로 [min, max] == [min, max + 1)) ----
+        starts: Dict[int, int] = {}
+        ends: Dict[int, int] = {}
+        for i, s in enumerate(self.subs):
+            lo, hi = int(s.rules.min_total_price), int(s.rules.max_total_price)
+            if lo > hi:
+                continue  # 가격이 있으면 절대 통과 못 하는 구독
+            starts[lo] = starts.get(lo, 0) | (1 << i)
+            ends[hi + 1] = ends.get(hi + 1, 0) | (1 << i)
+
+        # 경계값에서 시작하는 구간을 덮는 구독 마스크 (스윕)
+        self._bounds: List[int] = sorted(set(starts) | set(ends))
+        self._seg_masks: List[int] = []
+        cur = 0
+        for b in self._bounds:
+            cur = (cur & ~ends.get(b, 0)) | starts.get(b, 0)
+            self._seg_masks.append(cur)
+
+        # ---- 평점 하한 (오름차순 누적) ----
+        order = sorted(range(n), key=lambda i: float(self.subs[i].rules.min_rating))
+        self._ratings: List[float] = [float(self.subs[i].rules.min_rating) for i in order]
+        self._rating_prefix: List[int] = [0]
+        acc = 0
+        for i in order:
+            acc |= 1 << i
+            self._rating_prefix.append(acc)
+
+        # ---- 무료취소 필수 ----
+        self._free_cancel_required = 0
+        for i, s in enumerate(self.subs):
+            if s.rules.require_free_cancel:
+                self._free_cancel_required |= 1 << i
+
+    def __len__(self) -> int:
+        return len(self.subs)
+
+    def _price_mask(self, price: int) -> int:
+        k = bisect_right(self._bounds, price) - 1
+        return self._seg_masks[k] if k >= 0 else 0
+
+    def _mask(self, x: Listing) -> int:
+        m = self._all if x.price_total is None else self._price_mask(x.price_total)
+        if m and x.rating is not None:
+            m &= self._rating_prefix[bisect_right(self._ratings, x.rating)]
+        if m and x.free_cancel is False:
+            m &= ~self._free_cancel_required
+        return m
+
+    def match(self, x: Listing) -> List[Subscription]:
+        return [self.subs[i] for i in _bits(self._mask(x))]
+
+    def match_batch(self, listings: Sequence[Listing]) -> List[Tuple[Listing, Subscription]]:
+        out: List[Tuple[Listing, Subscription]] = []
+        for x in listings:
+            for i in _bits(self._mask(x)):
+                out.append((x, self.subs[i]))
+        return out
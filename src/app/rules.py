@@ -1,5 +1,6 @@
 ﻿from __future__ import annotations
 from dataclasses import dataclass
+from typing import Optional
 from src.providers.base import Listing
 
 @dataclass(frozen=True)
@@ -26,3 +27,26 @@ def match_rules(x: Listing, rules: Rules) -> bool:
         return False
 
     return True
+
+def rules_key(rules: Rules) -> str:
+    # 조건 서명: 조건(accept)에 따라 일찍 멈춘 검색 결과를 캐시/합류 키에서 나눌 때
+    return f"{rules.min_total_price}-{rules.max_total_price}-{rules.min_rating}-{int(rules.require_free_cancel)}"
+
+@dataclass(frozen=True)
+class PriceDropRule:
+    # 둘 중 하나라도 만족하면 가격 하락 알림 (0이면 해당 조건 사용 안 함)
+    min_drop_abs: int = 0
+    min_drop_pct: float = 0.0
+    # 비교 기준: 최근 window_hours 안에 알린 가격, 없으면 그 기간 최고가 (0이면 직전 가격)
+    window_hours: float = 24
+
+def match_price_drop(prev: Optional[int], cur: Optional[int], rule: PriceDropRule) -> bool:
+    # prev: PriceHistory.record_many(window=...)가 돌려준 기준가
+    if prev is None or cur is None or cur >= prev:
+        return False
+    drop = prev - cur
+    if rule.min_drop_abs and drop >= rule.min_drop_abs:
+        return True
+    if rule.min_drop_pct and drop * 100 >= rule.min_drop_pct * prev:
+        return True
+    return False
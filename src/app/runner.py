@@ -1,18 +1,34 @@
 ﻿from __future__ import annotations
 
+import time
+_T0 = time.perf_counter()  # 시작 소요 시간(stage=startup) 기준 — 아래 import 비용까지 포함 (봇과 같은 기준)
+
+import asyncio
 import yaml
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
-from utils.logging import log
-from storage.seen_store import SeenStore
-from notify.telegram import TelegramNotifier
-from app.rules import Rules, match_rules
-from app.formatter import format_msg
+from src.utils.logging import configure as configure_logging, log
+from src.utils.debug_dump import configure as configure_dumps, flush as flush_dumps
+from src.utils.net_block import TOTALS as NET_TOTALS
+from src.utils.http_pool import close_client
+from src.utils.metrics import METRICS, span
+from src.storage.seen_store import SeenStore
+from src.notify.telegram import TelegramNotifier
+from src.storage.price_history import HOUR, PriceHistory
+from src.storage.result_cache import ResultCache, canonical_url, scoped_key
+from src.app.rules import PriceDropRule, Rules, match_price_drop, match_rules, rules_key
+from src.app.formatter import format_drop_msg, format_msg
+from src.bot.query_builders import parse_stay_dates
+from src.app.scheduler import WatchScheduler
+from src.app.shared_fetch import SharedFetcher
+from src.app.circuit import CircuitBreaker, CircuitOpenError
+from src.app.workers import RemoteProvider, WorkerPool
 
-from providers.booking import BookingProvider
-from providers.agoda import AgodaProvider
-from providers.base import Listing
+from src.providers import registry
+from src.providers.base import Listing
+from src.utils.paginate import accept_scope
 
 
 def load_settings(path: str = "config/settings.yaml") -> Dict[str, Any]:
@@ -20,12 +36,136 @@ def load_settings(path: str = "config/settings.yaml") -> Dict[str, Any]:
         return yaml.safe_load(f)
 
 
-async def run_once() -> None:
-    load_dotenv()
-    settings = load_settings()
+@dataclass
+class QueryResult:
+    provider: str
+    name: str
+    url: str
+    listings: List[Listing] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    sent: int = 0
+    cached: bool = False
+    skipped: bool = False  # 차단 회로가 열려 있어서 건너뜀
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _limit(cfg: Dict[str, Any], key: str, default: int) -> int:
+    try:
+        return max(1, int(cfg.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+async def _fetch_query(
+    p: Any,
+    q: Dict[str, Any],
+    global_slots: asyncio.Semaphore,
+    provider_slots: asyncio.Semaphore,
+    cache: Optional[ResultCache] = None,
+    fetcher: Optional[SharedFetcher] = None,
+    accept: Optional[Callable[[Listing], bool]] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    scope: str = "",
+) -> QueryResult:
+    res = QueryResult(provider=p.name, name=q.get("name", "query"), url=q["url"])
+
+    # TTL 안에 같은 검색(정규화 URL + 조건 서명 scope)을 받은 적 있으면 슬롯도 안 잡고 바로 사용
+    if cache is not None:
+        cached = cache.get(res.url, scope)
+        if cached is not None:
+            res.listings, res.cached = cached, True
+            log(f"[{p.name}] cache hit={len(res.listings)} ({res.name})")
+            return res
+
+    async def slotted() -> List[Listing]:
+        t_wait = time.perf_counter()
+        async with global_slots, provider_slots:
+            METRICS.observe("stage_seconds", time.perf_counter() - t_wait, provider=p.name, stage="queue_wait")
+            log(f"[{p.name}] fetch start: {res.name}")
+            return await p.fetch(res.url, accept=accept)
+
+    async def run() -> List[Listing]:
+        # 같은 검색을 가리키는 쿼리가 동시에 있으면 한 번만 fetch
+        if fetcher is not None:
+            return await fetcher.fetch(scoped_key(canonical_url(res.url), scope), slotted)
+        return await slotted()
+
+    t0 = time.perf_counter()
+    try:
+        # 차단으로 열린 공급자는 슬롯도 안 잡고 바로 건너뜀 (half-open이면 시험 1건만 통과)
+        res.listings = await (breaker.call(p.name, run) if breaker is not None else run())
+        if cache is not None:
+            cache.put(res.url, res.listings, scope)
+    except CircuitOpenError as e:
+        res.error, res.skipped = str(e), True
+        log(f"[{p.name}] skipped: {res.name} -> {res.error}")
+        return res
+    except Exception as e:
+        # 쿼리 하나가 실패해도 나머지 쿼리는 계속 진행
+        res.error = f"{type(e).__name__}: {e}"
+    res.elapsed = time.perf_counter() - t0
+
+    if res.ok:
+        log(f"[{p.name}] fetched={len(res.listings)} ({res.name}, {res.elapsed:.1f}s)")
+    else:
+        log(f"[{p.name}] fetch failed: {res.name} -> {res.error}")
+    return res
+
+
+def _deliver(
+    res: QueryResult,
+    store: SeenStore,
+    rules: Rules,
+    notifier: Optional[TelegramNotifier],
+    history: Optional[PriceHistory] = None,
+    drop_rule: Optional[PriceDropRule] = None,
+) -> None:
+    # 이번 가격을 시계열에 남기고 하락 비교 기준가를 받아둔다 (최근 알린 가격 / 기간 최고가)
+    prev_prices: Dict[str, Optional[int]] = {}
+    stay = parse_stay_dates(res.url)
+    if history is not None:
+        with span(res.provider, "history"):
+            # 캐시 적중은 예전 관측을 다시 꺼낸 것 → 새 점으로 기록하지 않고 기준가만 조회
+            prev_prices = history.record_many(
+                res.listings, *stay, record=not res.cached,
+                window=drop_rule.window_hours * HOUR if drop_rule else 0,
+            )
+
+    # await 없이 seen 확인/추가를 끝내므로 동시 실행 중에도 같은 숙소를 두 번 보내지 않는다
+    for x in res.listings:
+        if store.touch(x.id):
+            # 이미 본 숙소: last_seen만 갱신 (TTL 기준), 가격이 충분히 내렸으면 하락 알림
+            prev = prev_prices.get(x.id)
+            if drop_rule and match_price_drop(prev, x.price_total, drop_rule) and match_rules(x, rules):
+                if notifier:
+                    notifier.send(format_drop_msg(x, prev))
+                if history is not None:
+                    history.mark_notified(x, *stay)
+                res.sent += 1
+                log(f"[{res.provider}] price drop: {x.title} {prev} -> {x.price_total}")
+            continue
+        if not match_rules(x, rules):
+            continue
+        if not store.add(x.id):
+            # 다른 프로세스(봇)가 먼저 보낸 경우
+            continue
+
+        if notifier:
+            notifier.send(format_msg(x))
+        if history is not None:
+            history.mark_notified(x, *stay)
+
+        res.sent += 1
+        log(f"[{res.provider}] sent: {x.title}")
 
+
+def build_rules(settings: Dict[str, Any]) -> Rules:
     rules_cfg = settings.get("rules", {})
-    rules = Rules(
+    return Rules(
         min_total_price=int(rules_cfg.get("min_total_price", 0)),
         max_total_price=int(rules_cfg.get("max_total_price", 999999999)),
         min_rating=float(rules_cfg.get("min_rating", 0.0)),
@@ -33,44 +173,290 @@ async def run_once() -> None:
     )
 
 
-    notifier = TelegramNotifier() if settings.get("telegram", {}).get("enabled", True) else None
+def build_notifier(settings: Dict[str, Any]) -> Optional[TelegramNotifier]:
+    tg_cfg = settings.get("telegram", {})
+    if not tg_cfg.get("enabled", True):
+        return None
+    return TelegramNotifier(
+        per_chat_rate=float(tg_cfg.get("per_chat_rate", 1.0)),
+        global_rate=float(tg_cfg.get("global_rate", 25.0)),
+    )
 
-    providers = []
-    if settings.get("booking", {}).get("enabled", True):
-        providers.append(BookingProvider())
-    if settings.get("agoda", {}).get("enabled", True):
-        providers.append(AgodaProvider())
 
-    total_sent = 0
+def build_providers(settings: Dict[str, Any]) -> List[Any]:
+    # 공급자 목록은 registry 한 곳에서 (봇 /run과 같은 목록, 쓰는 공급자 모듈만 import)
+    return registry.build_enabled(settings)
 
-    for p in providers:
-        queries = settings.get(p.name, {}).get("queries", [])
-        store = SeenStore(f"data/seen_{p.name}.json")
-        seen = store.load()
 
-        log(f"[{p.name}] queries={len(queries)} seen={len(seen)}")
+def mark_startup(entry: str, t0: Optional[float] = None) -> None:
+    """엔트리포인트 시작(t0, 기본은 이 모듈 import 시각)부터 준비 완료까지 → stage_seconds{stage=startup}"""
+    elapsed = time.perf_counter() - (_T0 if t0 is None else t0)
+    METRICS.observe("stage_seconds", elapsed, provider=entry, stage="startup")
+    log(f"[{entry}] startup {elapsed:.2f}s")
 
-        for q in queries:
-            url = q["url"]
-            name = q.get("name", "query")
-            log(f"[{p.name}] fetch start: {name}")
 
-            listings: List[Listing] = await p.fetch(url)
-            log(f"[{p.name}] fetched={len(listings)}")
+def open_price_history(settings: Dict[str, Any]) -> Optional[PriceHistory]:
+    cfg = settings.get("price_history", {})
+    if not cfg.get("enabled", True):
+        return None
+    return PriceHistory(
+        "data/price_history.sqlite3",
+        raw_days=float(cfg.get("raw_days", 7)),
+        hourly_days=float(cfg.get("hourly_days", 60)),
+        max_points=int(cfg.get("max_points", 2000)),
+    )
 
-            for x in listings:
-                if x.id in seen:
-                    continue
-                if not match_rules(x, rules):
-                    continue
 
-                if notifier:
-                    notifier.send(format_msg(x))
+def build_drop_rule(settings: Dict[str, Any]) -> Optional[PriceDropRule]:
+    cfg = settings.get("price_drop", {})
+    if not cfg.get("enabled", False):
+        return None
+    return PriceDropRule(
+        min_drop_abs=int(cfg.get("min_drop_abs", 0)),
+        min_drop_pct=float(cfg.get("min_drop_pct", 0.0)),
+        window_hours=float(cfg.get("window_hours", 24)),
+    )
+
+
+def open_result_cache(settings: Dict[str, Any], path: str = "data/result_cache.sqlite3") -> Optional[ResultCache]:
+    cfg = settings.get("cache", {})
+    if not cfg.get("enabled", True):
+        return None
+    return ResultCache(
+        ttl=float(cfg.get("ttl_sec", 300)),
+        max_entries=int(cfg.get("max_entries", 256)),
+        path=path if cfg.get("persist", True) else None,
+    )
+
+
+def open_breaker(settings: Dict[str, Any], path: str = "data/circuit.json") -> CircuitBreaker:
+    cfg = settings.get("circuit", {})
+    return CircuitBreaker(
+        path,
+        base_cooldown=float(cfg.get("base_cooldown_min", 15)) * 60,
+        max_cooldown=float(cfg.get("max_cooldown_min", 360)) * 60,
+        failure_threshold=int(cfg.get("failure_threshold", 3)),
+    )
+
+
+def export_metrics(settings: Dict[str, Any]) -> None:
+    # metrics.path 확장자가 .json이면 JSON, 아니면 Prometheus 텍스트
+    path = settings.get("metrics", {}).get("path")
+    if path:
+        METRICS.write(path)
+
+
+def build_scheduler(settings: Dict[str, Any]) -> WatchScheduler:
+    # src.watch와 봇이 같은 schedule 설정(jitter/백오프)을 쓰게
+    sched_cfg = settings.get("schedule", {})
+    return WatchScheduler(
+        jitter=float(sched_cfg.get("jitter", 0.1)),
+        max_backoff=float(sched_cfg.get("max_backoff_min", 240)) * 60,
+    )
+
+
+def open_seen_store(settings: Dict[str, Any], provider: str, data_dir: str = "data") -> SeenStore:
+    # 봇도 같은 함수로 연다 → TTL(storage.seen_ttl_days)이 CLI와 같게
+    seen_ttl = settings.get("storage", {}).get("seen_ttl_days", 30)
+    return SeenStore(f"{data_dir}/seen_{provider}.sqlite3", ttl_days=seen_ttl, provider=provider)
+
+
+async def start_browser(settings: Dict[str, Any]) -> None:
+    # ✅ 브라우저는 한 번만 띄우고 모든 쿼리가 공유 (Playwright는 여기서 처음 import)
+    from src.utils.playwright_pool import start_pool
+
+    browser_cfg = settings.get("browser", {})
+    await start_pool(
+        headless=bool(browser_cfg.get("headless", True)),
+        max_contexts=int(browser_cfg.get("max_contexts", 4)),
+    )
+
+
+async def stop_browser() -> None:
+    from src.utils.playwright_pool import shutdown_pool
+
+    await shutdown_pool()
+
+
+async def start_backend(settings: Dict[str, Any], providers: List[Any]) -> Tuple[List[Any], Optional[WorkerPool]]:
+    """
+    runner.backend: local → 이 프로세스에서 브라우저 하나를 공유
+    runner.backend: process → 워커 프로세스 N개가 각자 브라우저를 띄우고, 공급자는 워커로 보내는 대리 객체로 교체
+    """
+    if settings.get("runner", {}).get("backend", "local") != "process":
+        await start_browser(settings)
+        return providers, None
+    pool = WorkerPool.from_cfg(settings)
+    await pool.start()
+    return [RemoteProvider(pool, p.name) for p in providers], pool
+
+
+async def run_once() -> List[QueryResult]:
+    load_dotenv()
+    settings = load_settings()
+    configure_logging(settings.get("logging"))
+    configure_dumps(settings.get("debug_dump"))
+
+    rules = build_rules(settings)
+    drop_rule = build_drop_rule(settings)
+    notifier = build_notifier(settings)
+    providers = build_providers(settings)
+    mark_startup("runner")
+
+    # ✅ 동시 실행 한도: runner.max_concurrency(전체) + <provider>.max_concurrency(공급자별)
+    runner_cfg = settings.get("runner", {})
+    concurrent = runner_cfg.get("mode", "concurrent") == "concurrent"
+    global_slots = asyncio.Semaphore(_limit(runner_cfg, "max_concurrency", 4) if concurrent else 1)
+
+    providers, pool = await start_backend(settings, providers)
+
+    results: List[QueryResult] = []
+    history = open_price_history(settings)
+    cache = open_result_cache(settings)
+    fetcher = SharedFetcher()
+    accept = lambda x: match_rules(x, rules)
+    breaker = open_breaker(settings)
+    stores: Dict[str, SeenStore] = {}
+    tasks: List[asyncio.Task] = []
+    try:
+
+        for p in providers:
+            p_cfg = settings.get(p.name, {})
+            queries = p_cfg.get("queries", [])
+            store = open_seen_store(settings, p.name)
+            stores[p.name] = store
+
+            log(f"[{p.name}] queries={len(queries)} seen={len(store)}")
+
+            provider_slots = asyncio.Semaphore(_limit(p_cfg, "max_concurrency", 2))
+            for q in queries:
+                tasks.append(asyncio.create_task(
+                    _fetch_query(
+                        p, q, global_slots, provider_slots, cache, fetcher, accept, breaker,
+                        scope=accept_scope(p, rules_key(rules)),
+                    )
+                ))
+
+        # 끝나는 순서대로 바로 알림 처리
+        for fut in asyncio.as_completed(tasks):
+            res = await fut
+            if res.ok:
+                with span(res.provider, "deliver"):
+                    _deliver(res, stores[res.provider], rules, notifier, history, drop_rule)
+            results.append(res)
+    finally:
+        # 중간에 예외가 나도 남은 쿼리는 멈추고, SQLite(WAL 체크포인트)는 꼭 닫는다
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for store in stores.values():
+            store.close()
+        if history is not None:
+            history.close()
+        if cache is not None:
+            log(f"cache {cache.stats()}")
+            cache.close()
+        if pool is not None:
+            await pool.close()
+        await flush_dumps()
+        await stop_browser()
+        await close_client()
+        # 수집 중에 쌓인 알림은 백그라운드로 나가고 있었음 → 남은 것만 마저 보내고 종료
+        if notifier:
+            await notifier.aclose()
+        export_metrics(settings)
+
+    # ✅ 쿼리별 결과 요약
+    for r in results:
+        status = f"fetched={len(r.listings)} sent={r.sent}" if r.ok else f"FAILED {r.error}"
+        if r.skipped:
+            status = f"SKIPPED {r.error}"
+        if r.cached:
+            status += " (cache)"
+        log(f"[{r.provider}] {r.name}: {status} ({r.elapsed:.1f}s)")
+
+    for name, st in NET_TOTALS.items():
+        log(f"[{name}] net total {st.summary()}")
+
+    total_sent = sum(r.sent for r in results)
+    failed = sum(1 for r in results if not r.ok and not r.skipped)
+    skipped = sum(1 for r in results if r.skipped)
+    log(f"done total_sent={total_sent} queries={len(results)} failed={failed} skipped={skipped}")
+    return results
+
+
+async def run_watch() -> None:
+    """
+    상시 감시 모드: 브라우저/알림기/seen 저장소를 한 번만 열어두고
+    settings.yaml의 쿼리마다 자기 주기(interval_min)로 반복 실행한다.
+    """
+    load_dotenv()
+    settings = load_settings()
+    configure_logging(settings.get("logging"))
+    configure_dumps(settings.get("debug_dump"))
+
+    rules = build_rules(settings)
+    drop_rule = build_drop_rule(settings)
+    notifier = build_notifier(settings)
+    providers = build_providers(settings)
+    history = open_price_history(settings)
+    mark_startup("watch")
+
+    sched_cfg = settings.get("schedule", {})
+    default_interval = float(sched_cfg.get("interval_min", 15)) * 60
+    scheduler = build_scheduler(settings)
+
+    runner_cfg = settings.get("runner", {})
+    global_slots = asyncio.Semaphore(_limit(runner_cfg, "max_concurrency", 4))
+    breaker = open_breaker(settings)
+
+    providers, pool = await start_backend(settings, providers)
+    stores: Dict[str, SeenStore] = {}
+    try:
+        for p in providers:
+            p_cfg = settings.get(p.name, {})
+            stores[p.name] = open_seen_store(settings, p.name)
+            provider_slots = asyncio.Semaphore(_limit(p_cfg, "max_concurrency", 2))
+
+            for q in p_cfg.get("queries", []):
+                interval = float(q.get("interval_min", 0)) * 60 or default_interval
+
+                async def job(p=p, q=q, provider_slots=provider_slots) -> Optional[int]:
+                    res = await _fetch_query(
+                        p, q, global_slots, provider_slots,
+                        accept=lambda x: match_rules(x, rules), breaker=breaker,
+                    )
+                    if res.skipped:
+                        return None  # 차단 대기 → 0건/실패로 안 셈 (백오프 없이 원래 주기로)
+                    if not res.ok:
+                        raise RuntimeError(res.error)
+                    with span(p.name, "deliver"):
+                        _deliver(res, stores[p.name], rules, notifier, history, drop_rule)
+                    return len(res.listings)
+
+                scheduler.add(f"{p.name}:{q.get('name', 'query')}", interval, job)
+
+        metrics_every = float(settings.get("metrics", {}).get("interval_sec", 60))
 
-                seen.add(x.id)
-                total_sent += 1
-                log(f"[{p.name}] sent: {x.title}")
+        async def write_metrics() -> int:
+            export_metrics(settings)
+            return 1
 
-        store.save(seen)
+        scheduler.add("metrics", metrics_every, write_metrics, first_delay=metrics_every)
 
-    log(f"done total_sent={total_sent}")
+        log(f"watch start jobs={len(scheduler.jobs())}")
+        await scheduler.run_forever()
+    finally:
+        await scheduler.stop()
+        if pool is not None:
+            await pool.close()
+        await flush_dumps()
+        await stop_browser()
+        await close_client()
+        for store in stores.values():
+            store.close()
+        if history is not None:
+            history.close()
+        if notifier:
+            await notifier.aclose()
+        export_metrics(settings)
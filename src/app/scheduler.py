@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.utils.logging import log
+
+# 한 번 실행하고 결과 건수를 돌려주는 코루틴 (실패면 예외, 건너뛰었으면 None)
+JobFn = Callable[[], Awaitable[Optional[int]]]
+
+
+@dataclass
+class WatchJob:
+    key: str
+    interval: float                  # 초
+    run: JobFn
+    next_at: float = 0.0
+    failures: int = 0                # 연속 실패 횟수
+    empties: int = 0                 # 연속 0건 횟수
+    runs: int = 0
+    skipped: int = 0                 # 이전 실행이 진행 중이라 건너뛴 틱
+    passes: int = 0                  # job이 None을 돌려준 횟수 (차단 대기 등)
+    last_count: Optional[int] = None
+    last_error: Optional[str] = None
+    last_run: float = 0.0
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+class WatchScheduler:
+    """
+    프로세스 안에서 도는 감시 스케줄러.
+    - 쿼리(job)마다 자기 주기로 실행, 주기에 ±jitter 비율만큼 랜덤 가감
+    - 이전 실행이 아직 안 끝났으면 그 틱은 건너뜀
+    - 연속 실패/0건이면 주기를 2배씩 늘림 (max_backoff 초까지)
+    - job이 None을 돌려주면(차단 회로 대기 등) 실패도 0건도 아님 → 백오프 그대로, 원래 주기로 다시
+    """
+
+    def __init__(self, jitter: float = 0.1, max_backoff: float = 4 * 3600):
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self._jobs: Dict[str, WatchJob] = {}
+        self._wake = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    # ---- job 관리 ----
+    def add(self, key: str, interval: float, run: JobFn, first_delay: Optional[float] = None) -> WatchJob:
+        self.remove(key)
+        delay = random.uniform(0, min(interval, 30)) if first_delay is None else first_delay
+        job = WatchJob(key=key, interval=interval, run=run, next_at=time.monotonic() + delay)
+        self._jobs[key] = job
+        self._wake.set()
+        return job
+
+    def remove(self, key: str) -> bool:
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        if job.running:
+            job.task.cancel()
+        return True
+
+    def jobs(self) -> List[WatchJob]:
+        return list(self._jobs.values())
+
+    # ---- 주기 계산 ----
+    def _delay(self, job: WatchJob) -> float:
+        streak = max(job.failures, job.empties)
+        base = min(job.interval * (2 ** min(streak, 16)), max(job.interval, self.max_backoff))
+        return max(1.0, base * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def _run_job(self, job: WatchJob, started: float) -> None:
+        try:
+            count = await job.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            log(f"[watch] {job.key} 실패({job.failures}연속): {job.last_error}")
+        else:
+            if count is None:
+                job.passes += 1
+                return
+            job.failures = 0
+            job.last_error = None
+            job.last_count = count
+            job.empties = job.empties + 1 if count == 0 else 0
+        finally:
+            job.runs += 1
+            job.last_run = time.time()
+
+        if job.failures or job.empties:
+            # 백오프: 다음 실행을 늦춘다
+            job.next_at = max(job.next_at, started + self._delay(job))
+            self._wake.set()
+
+    def _dispatch(self, now: float) -> None:
+        for job in list(self._jobs.values()):
+            if job.next_at > now:
+                continue
+            job.next_at = now + self._delay(job)
+            if job.running:
+                job.skipped += 1
+                log(f"[watch] {job.key} 이전 실행 진행 중 → 이번 틱 건너뜀")
+                continue
+            job.task = asyncio.create_task(self._run_job(job, now))
+
+    # ---- 메인 루프 ----
+    async def run_forever(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._dispatch(now)
+            nearest = min((j.next_at for j in self._jobs.values()), default=now + 60)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(0.05, nearest - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> asyncio.Task:
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self.run_forever())
+        return self._loop_task
+
+    async def stop(self) -> None:
+        tasks = [j.task for j in self._jobs.values() if j.running]
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List
+
+from src.providers.base import Listing
+from src.utils.logging import log
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SharedFetcher:
+    """
+    같은 검색 키로 동시에 들어온 fetch를 하나로 합친다 (single-flight).
+
+    - 진행 중인 키가 있으면 새 브라우저를 띄우지 않고 그 결과를 같이 기다린다.
+    - 끝나면 바로 잊는다 (결과 캐시는 아님 → 다음 호출은 새로 fetch).
+    - fetch는 처음 부른 쪽과 따로 도는 task → 처음 부른 쪽이 취소돼도(/cancel 등) 합류한 쪽은 결과를 받는다.
+      기다리는 쪽이 하나도 안 남으면 그때 취소 (브라우저 page/context는 공급자 finally에서 닫힘).
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, _Flight] = {}
+        self.started = 0
+        self.joined = 0
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def fetch(self, key: str, run: Callable[[], Awaitable[List[Listing]]]) -> List[Listing]:
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(task=asyncio.create_task(run()))
+            self._inflight[key] = flight
+            self.started += 1
+            flight.task.add_done_callback(lambda t, key=key, flight=flight: self._done(key, flight))
+        else:
+            self.joined += 1
+            log(f"[shared] join {key}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                log(f"[shared] cancel {key} (기다리는 쪽 없음)")
+                flight.task.cancel()
+
+    def _done(self, key: str, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # 기다리는 쪽이 없어도 "never retrieved" 경고 안 나게
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.app.circuit import CircuitBreaker
+from src.providers.base import Listing
+from src.storage.result_cache import ResultCache
+from src.utils.logging import log
+
+Cell = Tuple[str, str]  # (checkin, checkout)
+
+
+@dataclass(frozen=True)
+class SweepSpec:
+    """
+    날짜 스윕 범위 (settings.yaml의 sweep 섹션 / 봇 /sweep)
+    - start ~ end: 체크인 날짜 범위 (end 포함)
+    - nights: 숙박 일수 목록 → 체크인 x 숙박일수 격자
+    - max_cells: 격자가 이보다 크면 앞쪽만 (실수로 수백 번 검색하지 않게)
+    """
+    start: str
+    end: str
+    nights: Tuple[int, ...] = (1, 2)
+    max_cells: int = 28
+
+    @classmethod
+    def from_cfg(cls, cfg: Optional[Dict[str, Any]], start: str, **overrides: Any) -> "SweepSpec":
+        cfg = cfg or {}
+        first = date.fromisoformat(start)
+        days = int(cfg.get("days", 7))
+        spec = cls(
+            start=start,
+            end=(first + timedelta(days=max(0, days - 1))).isoformat(),
+            nights=tuple(int(n) for n in cfg.get("nights", (1, 2))),
+            max_cells=int(cfg.get("max_cells", 28)),
+        )
+        overrides = {k: v for k, v in overrides.items() if v is not None}
+        return cls(**{**spec.__dict__, **overrides})
+
+    def cells(self) -> List[Cell]:
+        first, last = date.fromisoformat(self.start), date.fromisoformat(self.end)
+        out: List[Cell] = []
+        d = first
+        while d <= last:
+            for n in self.nights:
+                out.append((d.isoformat(), (d + timedelta(days=n)).isoformat()))
+            d += timedelta(days=1)
+        return out[: self.max_cells]
+
+
+@dataclass
+class SweepResult:
+    cells: List[Cell]
+    # 숙소 id → 칸 → 총액
+    prices: Dict[str, Dict[Cell, int]] = field(default_factory=dict)
+    titles: Dict[str, str] = field(default_factory=dict)
+    errors: Dict[Cell, str] = field(default_factory=dict)
+    cached: int = 0
+
+    def add(self, cell: Cell, listings: List[Listing]) -> None:
+        for x in listings:
+            if x.price_total is None:
+                continue
+            row = self.prices.setdefault(x.id, {})
+            row[cell] = min(x.price_total, row.get(cell, x.price_total))
+            self.titles.setdefault(x.id, x.title)
+
+    def cheapest(self) -> Dict[Cell, int]:
+        """칸별 최저가 (모든 숙소 중)"""
+        out: Dict[Cell, int] = {}
+        for row in self.prices.values():
+            for cell, p in row.items():
+                out[cell] = min(p, out.get(cell, p))
+        return out
+
+    def top_hotels(self, n: int) -> List[str]:
+        return sorted(self.prices, key=lambda k: min(self.prices[k].values()))[:n]
+
+
+async def run_sweep(
+    provider: Any,
+    url_for: Callable[[str, str], str],
+    spec: SweepSpec,
+    cache: Optional[ResultCache] = None,
+    concurrency: int = 3,
+    accept: Optional[Callable[[Listing], bool]] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    scope: str = "",
+) -> SweepResult:
+    """
+    격자의 모든 (체크인, 체크아웃)을 동시에 검색 (동시 실행은 concurrency개까지, 브라우저는 풀 공유).
+    캐시에 있는 칸은 브라우저를 안 씀. accept를 주면 조건 통과한 숙소만 표에 넣는다.
+    scope: accept의 조건 서명 (캐시 키에 붙임)
+    """
+    res = SweepResult(cells=spec.cells())
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(cell: Cell) -> None:
+        url = url_for(*cell)
+
+        async def fetch() -> List[Listing]:
+            async with slots:
+                if breaker is not None:
+                    return await breaker.call(provider.name, lambda: provider.fetch(url, accept=accept))
+                return await provider.fetch(url, accept=accept)
+
+        try:
+            if cache is not None:
+                listings, hit = await cache.get_or_fetch(url, fetch, scope=scope)
+                res.cached += hit
+            else:
+                listings = await fetch()
+        except Exception as e:
+            # 한 칸이 실패해도 나머지 칸은 계속
+            res.errors[cell] = f"{type(e).__name__}: {e}"
+            log(f"[{provider.name}] sweep {cell[0]}~{cell[1]} failed: {res.errors[cell]}")
+            return
+        res.add(cell, [x for x in listings if accept is None or accept(x)])
+
+    await asyncio.gather(*(one(c) for c in res.cells))
+    log(f"[{provider.name}] sweep cells={len(res.cells)} cached={res.cached} "
+        f"failed={len(res.errors)} hotels={len(res.prices)}")
+    return res
@@ -0,0 +1,296 @@
+from __future__ import annotations
+import asyncio
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.providers.base import BlockedError, Listing
+from src.utils.logging import log
+from src.utils.metrics import METRICS
+
+# 워커 → 코디네이터로 한 번에 보내는 숙소 수 (큰 결과도 조금씩 흘려보냄)
+CHUNK = 50
+
+
+class WorkerError(RuntimeError):
+    """워커 프로세스 안에서 난 오류 (원래 예외 이름 + 메시지) 또는 워커가 죽어서 못 끝낸 쿼리"""
+
+
+# ---- 워커 프로세스 쪽 ----
+def _worker_log_cfg(cfg: Optional[Dict[str, Any]], index: int) -> Dict[str, Any]:
+    # 같은 로그 파일을 여러 프로세스가 교체(rotate)하면 꼬임 → 워커마다 파일을 나눈다
+    cfg = dict(cfg or {})
+    path = Path(cfg.get("path", "logs/bot.log"))
+    cfg["path"] = str(path.with_name(f"{path.stem}.w{index}{path.suffix}"))
+    return cfg
+
+
+def _worker_main(index: int, settings: Dict[str, Any], tasks: Any, results: Any) -> None:
+    """spawn된 워커 프로세스 진입점: 자기 Playwright/Chromium을 띄우고 받은 쿼리를 실행"""
+    try:
+        asyncio.run(_worker_loop(index, settings, tasks, results))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index: int, settings: Dict[str, Any], tasks: Any, results: Any) -> None:
+    # runner는 이 모듈을 import하므로 여기서 늦게 가져온다
+    from src.app.rules import match_rules
+    from src.app.runner import build_providers, build_rules, start_browser
+    from src.utils.debug_dump import configure as configure_dumps, flush as flush_dumps
+    from src.utils.http_pool import close_client
+    from src.utils.logging import configure as configure_logging
+    from src.utils.playwright_pool import shutdown_pool
+
+    configure_logging(_worker_log_cfg(settings.get("logging"), index))
+    configure_dumps(settings.get("debug_dump"))
+    rules = build_rules(settings)
+    providers = {p.name: p for p in build_providers(settings)}
+    accept = lambda x: match_rules(x, rules)
+
+    await start_browser(settings)
+    log(f"[worker{index}] ready providers={list(providers)}")
+
+    async def run_one(task_id: int, attempt: int, name: str, url: str) -> None:
+        kind, msg, reason = None, "", None
+        try:
+            listings = await providers[name].fetch(url, accept=accept)
+            for i in range(0, len(listings), CHUNK):
+                results.put(("items", task_id, attempt, listings[i:i + CHUNK]))
+        except BlockedError as e:
+            kind, msg, reason = type(e).__name__, str(e), e.reason
+        except Exception as e:
+            kind, msg = type(e).__name__, str(e)
+        # 단계별 시간/카운터는 증분만 같이 보냄 → 코디네이터가 합쳐서 내보낸다
+        results.put(("done", task_id, attempt, kind, msg, reason, METRICS.drain()))
+
+    running: Set[asyncio.Task] = set()
+    try:
+        while True:
+            msg = await asyncio.to_thread(tasks.get)
+            if msg is None:
+                break
+            t = asyncio.create_task(run_one(*msg))
+            running.add(t)
+            t.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        await flush_dumps()
+        await shutdown_pool()
+        await close_client()
+
+
+# ---- 코디네이터 쪽 ----
+@dataclass
+class _Task:
+    id: int
+    provider: str
+    url: str
+    future: asyncio.Future
+    listings: List[Listing] = field(default_factory=list)
+    worker: int = -1
+    attempt: int = 0
+
+
+@dataclass
+class _Worker:
+    index: int
+    proc: Any
+    tasks: Any
+    inflight: Set[int] = field(default_factory=set)
+    crashes: int = 0   # 연속으로 죽은 횟수 (쿼리 하나라도 끝내면 0)
+    dead: bool = False # max_crashes를 넘겨서 더는 안 띄움
+
+
+class WorkerPool:
+    """
+    쿼리를 워커 프로세스 N개에 나눠 실행한다 (runner.backend: process).
+    - 워커마다 자기 Playwright 드라이버 + Chromium → CDP 처리/파싱이 코어 하나에 몰리지 않음
+    - 숙소 결과는 CHUNK개씩 흘려받고, seen/규칙/알림/캐시/차단 회로는 코디네이터(이 프로세스)가 맡는다
+    - 워커가 죽으면 새로 띄우고, 그 워커가 들고 있던 쿼리는 다시 보낸다 (max_retries번까지)
+    - 뜨자마자 계속 죽는 워커(브라우저 실행 실패 등)는 max_crashes번 연속이면 포기
+    """
+
+    def __init__(
+        self,
+        settings: Dict[str, Any],
+        workers: int = 2,
+        max_retries: int = 1,
+        max_crashes: int = 5,
+        check_sec: float = 1.0,
+    ):
+        self.settings = settings
+        self.size = max(1, workers)
+        self.max_retries = max(0, max_retries)
+        self.max_crashes = max(1, max_crashes)
+        self.check_sec = check_sec
+        self._ctx = mp.get_context("spawn")  # fork는 이벤트 루프/스레드 상태까지 복사함
+        self._results = self._ctx.Queue()
+        self._workers: List[_Worker] = []
+        self._tasks: Dict[int, _Task] = {}
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @classmethod
+    def from_cfg(cls, settings: Dict[str, Any]) -> "WorkerPool":
+        cfg = settings.get("runner", {})
+        return cls(
+            settings,
+            workers=int(cfg.get("workers", 2)),
+            max_retries=int(cfg.get("worker_retries", 1)),
+            max_crashes=int(cfg.get("worker_max_crashes", 5)),
+        )
+
+    # ---- 수명 ----
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._workers = [self._spawn(i) for i in range(self.size)]
+        self._reader = threading.Thread(target=self._read, name="worker-results", daemon=True)
+        self._reader.start()
+        self._monitor = asyncio.create_task(self._watch())
+        log(f"worker pool start workers={self.size}")
+
+    def _spawn(self, index: int) -> _Worker:
+        tasks = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.settings, tasks, self._results),
+            name=f"stay-worker{index}",
+            daemon=True,
+        )
+        proc.start()
+        return _Worker(index=index, proc=proc, tasks=tasks)
+
+    async def close(self, timeout: float = 30) -> None:
+        self._closing = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for w in self._workers:
+            w.tasks.put(None)
+        deadline = time.monotonic() + timeout
+        for w in self._workers:
+            await asyncio.to_thread(w.proc.join, max(0.1, deadline - time.monotonic()))
+            if w.proc.is_alive():
+                w.proc.terminate()
+        for t in self._tasks.values():
+            if not t.future.done():
+                t.future.set_exception(WorkerError("worker pool closed"))
+        self._tasks.clear()
+        if self._reader is not None:
+            self._reader.join(timeout=2)
+
+    # ---- 실행 ----
+    async def fetch(self, provider: str, url: str) -> List[Listing]:
+        task = _Task(id=next(self._ids), provider=provider, url=url, future=self._loop.create_future())
+        self._tasks[task.id] = task
+        self._dispatch(task)
+        try:
+            return await task.future
+        finally:
+            self._tasks.pop(task.id, None)
+
+    def _dispatch(self, task: _Task) -> None:
+        alive = [w for w in self._workers if not w.dead]
+        if not alive:
+            task.future.set_exception(WorkerError("no live workers"))
+            return
+        # 들고 있는 쿼리가 가장 적은 워커로
+        w = min(alive, key=lambda w: len(w.inflight))
+        task.worker, task.listings = w.index, []
+        w.inflight.add(task.id)
+        w.tasks.put((task.id, task.attempt, task.provider, task.url))
+
+    def _read(self) -> None:
+        # 결과 큐는 블로킹 → 별도 스레드에서 읽어 이벤트 루프로 넘김
+        while not self._closing:
+            try:
+                msg = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._on_msg, msg)
+
+    def _on_msg(self, msg: Tuple[Any, ...]) -> None:
+        kind, task_id, attempt = msg[:3]
+        task = self._tasks.get(task_id)
+        if kind == "done":
+            METRICS.merge(*msg[6])
+        # 이미 끝났거나 죽은 워커가 남긴 이전 시도의 메시지는 버린다
+        if task is None or task.attempt != attempt or task.future.done():
+            return
+        if kind == "items":
+            task.listings.extend(msg[3])
+            return
+
+        w = self._workers[task.worker]
+        w.inflight.discard(task_id)
+        w.crashes = 0
+        err_kind, err_msg, reason = msg[3:6]
+        if err_kind is None:
+            task.future.set_result(task.listings)
+        elif reason is not None:
+            # 차단은 원래 타입으로 → 코디네이터의 차단 회로가 바로 열린다
+            task.future.set_exception(BlockedError(task.provider, reason))
+        else:
+            task.future.set_exception(WorkerError(f"{err_kind}: {err_msg}"))
+
+    async def _watch(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self.check_sec)
+            for i, w in enumerate(self._workers):
+                if not w.dead and not w.proc.is_alive() and not self._closing:
+                    self._restart(i)
+
+    def _restart(self, i: int) -> None:
+        old = self._workers[i]
+        crashes = old.crashes + 1
+        if crashes >= self.max_crashes:
+            old.dead, old.crashes = True, crashes
+            log(f"[worker{i}] died {crashes}x in a row (exitcode={old.proc.exitcode}) → give up")
+        else:
+            METRICS.inc("worker_restarts_total", worker=i)
+            log(f"[worker{i}] died (exitcode={old.proc.exitcode}) → restart, inflight={len(old.inflight)}")
+            self._workers[i] = self._spawn(i)
+            self._workers[i].crashes = crashes
+
+        # 들고 있던 쿼리는 이번 사이클 안에서 다시 보냄
+        inflight, old.inflight = old.inflight, set()
+        for task_id in inflight:
+            task = self._tasks.get(task_id)
+            if task is None or task.future.done():
+                continue
+            if task.attempt >= self.max_retries:
+                task.future.set_exception(WorkerError(f"worker{i} crashed (exitcode={old.proc.exitcode})"))
+                continue
+            task.attempt += 1
+            self._dispatch(task)
+
+    def status_text(self) -> str:
+        return ", ".join(
+            f"w{w.index}:{'up' if w.proc.is_alive() else 'down'} inflight={len(w.inflight)} crashes={w.crashes}"
+            for w in self._workers
+        )
+
+
+class RemoteProvider:
+    """
+    워커 풀로 fetch를 보내는 공급자 대리 객체 (runner의 _fetch_query가 그대로 쓰게).
+    accept는 프로세스 경계를 못 넘음 → 워커가 settings의 rules로 같은 조건을 다시 만든다.
+    """
+
+    def __init__(self, pool: WorkerPool, name: str):
+        self.pool = pool
+        self.name = name
+
+    async def fetch(self, url: str, accept: Optional[Callable[[Listing], bool]] = None) -> List[Listing]:
+        return await self.pool.fetch(self.name, url)
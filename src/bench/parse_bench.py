@@ -0,0 +1,292 @@
+"""
+저장된 HTML로 공급자 파서를 오프라인 측정한다 (라이브 사이트/네트워크 불필요).
+
+    python -m src.bench.parse_bench                      # data/fixtures + data/debug (+ 아래 --check)
+    python -m src.bench.parse_bench --check              # 커밋된 픽스처 채움 비율만 기준값과 비교 → 떨어지면 exit 1
+    python -m src.bench.parse_bench --check --update     # 파서를 고친 뒤 기준값(data/fixtures/baseline.json) 갱신
+    python -m src.bench.parse_bench --browser            # 로컬 headless 페이지(set_content)로도 측정
+    python -m src.bench.parse_bench --save-baseline data/bench_baseline.json
+    python -m src.bench.parse_bench --baseline data/bench_baseline.json   # 속도까지 회귀 시 exit 1
+
+픽스처 찾는 규칙
+- data/fixtures/<provider>/*.html(.gz)     → parse_html
+- data/fixtures/<provider>/*.json          → _decode_api (리포트 이름 <provider>/api)
+- data/debug/<provider>_*.html(.gz)   (utils/debug_dump가 남긴 파일)
+
+data/fixtures는 실제 페이지 구조만 본뜬 합성 HTML/JSON (숙소명/가격/링크는 가짜).
+선택자를 바꾸면 픽스처도 같이 고치고 --check --update로 기준값을 다시 저장한다.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.providers.base import Listing
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # stay-watcher/
+FIXTURE_DIR = ROOT_DIR / "data" / "fixtures"
+FIXTURE_BASELINE = FIXTURE_DIR / "baseline.json"
+
+BASE_URLS = {
+    "booking": "https://www.booking.com/searchresults.html",
+    "agoda": "https://www.agoda.com/",
+    "trip": "https://kr.trip.com/hotels/list",
+}
+
+FILL_FIELDS = ("price_total", "rating", "reviews", "location_text")
+
+
+def _providers() -> Dict[str, Any]:
+    from src.providers import registry
+    return {name: registry.create(name) for name in registry.names()}
+
+
+def _read(path: Path) -> str:
+    if path.suffix == ".gz":
+        return gzip.decompress(path.read_bytes()).decode("utf-8", errors="replace")
+    return path.read_text(encoding="utf-8", errors="replace")
+
+
+def find_fixtures(dirs: List[Path]) -> Dict[str, List[Path]]:
+    """리포트 이름(<provider> 또는 <provider>/api) → 파일들"""
+    out: Dict[str, List[Path]] = {}
+    for d in dirs:
+        if not d.exists():
+            continue
+        for path in sorted(d.rglob("*")):
+            if path.name.endswith(".html") or path.name.endswith(".html.gz"):
+                kind = ""
+            elif path.suffix == ".json" and path.parent != d:
+                kind = "/api"   # 공급자 폴더 안의 API 응답만 (baseline.json 제외)
+            else:
+                continue
+            name = path.parent.name if path.parent.name in BASE_URLS else path.name.split("_", 1)[0]
+            if name in BASE_URLS:
+                out.setdefault(name + kind, []).append(path)
+    return out
+
+
+def _parser(provider: Any, key: str) -> Callable[[str], List[Listing]]:
+    if key.endswith("/api"):
+        return lambda text: provider._decode_api(json.loads(text))
+    base = BASE_URLS[key]
+    return lambda html: provider.parse_html(html, base)
+
+
+@dataclass
+class ProviderReport:
+    provider: str
+    files: int = 0
+    listings: int = 0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    peak_kb: float = 0.0
+    fill: Dict[str, float] = field(default_factory=dict)
+    browser_p50_ms: Optional[float] = None
+
+
+def _fill_rates(listings: List[Listing]) -> Dict[str, float]:
+    if not listings:
+        return {f: 0.0 for f in FILL_FIELDS}
+    return {
+        f: round(sum(1 for x in listings if getattr(x, f) not in (None, "")) / len(listings), 3)
+        for f in FILL_FIELDS
+    }
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def coverage(parse: Callable[[str], List[Listing]], name: str, pages: List[str]) -> ProviderReport:
+    """정확도만: 숙소 수 + 필드 채움 비율"""
+    rep = ProviderReport(provider=name, files=len(pages))
+    listings: List[Listing] = []
+    for text in pages:
+        listings.extend(parse(text))
+    rep.listings = len(listings)
+    rep.fill = _fill_rates(listings)
+    return rep
+
+
+def bench_html(provider: Any, name: str, pages: List[str], repeat: int) -> ProviderReport:
+    parse = _parser(provider, name)
+
+    # 1) 정확도: 필드 채움 비율
+    rep = coverage(parse, name, pages)
+
+    # 2) 지연: 페이지당 파싱 시간 (tracemalloc 없이)
+    times: List[float] = []
+    for _ in range(repeat):
+        for text in pages:
+            t0 = time.perf_counter()
+            parse(text)
+            times.append((time.perf_counter() - t0) * 1000)
+    rep.p50_ms = round(statistics.median(times), 3)
+    rep.p95_ms = round(_pct(times, 0.95), 3)
+
+    # 3) 메모리: 페이지 하나 파싱할 때 최대 할당량
+    peak = 0
+    for text in pages:
+        tracemalloc.start()
+        parse(text)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    rep.peak_kb = round(peak / 1024, 1)
+    return rep
+
+
+async def bench_browser(provider: Any, name: str, pages: List[str], repeat: int) -> float:
+    """로컬 headless 페이지에 HTML을 넣고 extract_cards(1회 evaluate) 경로를 측정 → p50 ms"""
+    from src.providers import agoda, booking, trip
+    from src.utils.extract import extract_cards
+    from src.utils.playwright_pool import browser_context, shutdown_pool
+
+    mod = {"booking": booking, "agoda": agoda, "trip": trip}[name]
+    times: List[float] = []
+    try:
+        async with browser_context(headless=True) as ctx:
+            page = await ctx.new_page()
+            # 오프라인: 외부 요청은 전부 차단
+            await page.route("**/*", lambda route: route.abort())
+            for html in pages:
+                await page.set_content(html, wait_until="domcontentloaded")
+                sel = await page.evaluate(
+                    "(cands) => cands.find((s) => document.querySelector(s)) || null",
+                    mod.CARD_CANDIDATES,
+                )
+                if not sel:
+                    continue
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    rows = await extract_cards(page, sel, mod.CARD_FIELDS, limit=25)
+                    provider._build(rows, BASE_URLS[name])
+                    times.append((time.perf_counter() - t0) * 1000)
+    finally:
+        await shutdown_pool()
+    return round(statistics.median(times), 3) if times else 0.0
+
+
+def compare(reports: List[ProviderReport], baseline: Dict[str, Any], max_slowdown: float, max_fill_drop: float) -> List[str]:
+    problems: List[str] = []
+    for r in reports:
+        b = baseline.get(r.provider)
+        if not b:
+            continue
+        if b.get("p50_ms") and r.p50_ms > b["p50_ms"] * max_slowdown:
+            problems.append(f"{r.provider}: p50 {r.p50_ms}ms > {b['p50_ms']}ms x{max_slowdown}")
+        if r.listings < b.get("listings", 0):
+            problems.append(f"{r.provider}: listings {r.listings} < {b['listings']}")
+        for f, v in (b.get("fill") or {}).items():
+            if r.fill.get(f, 0.0) < v - max_fill_drop:
+                problems.append(f"{r.provider}: fill[{f}] {r.fill.get(f, 0.0)} < {v}")
+    return problems
+
+
+def check_fixtures(providers: Dict[str, Any], max_fill_drop: float, update: bool = False) -> List[str]:
+    """
+    data/fixtures만 파싱해서 FIXTURE_BASELINE의 숙소 수/채움 비율과 비교 (속도는 기계마다 달라서 안 봄).
+    update면 지금 결과를 기준값으로 저장.
+    """
+    fixtures = find_fixtures([FIXTURE_DIR])
+    reports = [
+        coverage(_parser(providers[key.split("/")[0]], key), key, [_read(p) for p in paths])
+        for key, paths in sorted(fixtures.items())
+    ]
+    if update:
+        FIXTURE_BASELINE.write_text(
+            json.dumps({r.provider: {"files": r.files, "listings": r.listings, "fill": r.fill} for r in reports},
+                       ensure_ascii=False, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"기준값 저장: {FIXTURE_BASELINE}")
+        return []
+    if not FIXTURE_BASELINE.exists():
+        return [f"기준값이 없습니다: {FIXTURE_BASELINE} (--check --update로 만들기)"]
+
+    baseline = json.loads(FIXTURE_BASELINE.read_text(encoding="utf-8"))
+    # 픽스처가 지워졌거나 공급자 셀렉터가 통째로 안 맞으면 리포트 자체가 없음 → 0건으로 비교
+    missing = [ProviderReport(provider=k) for k in baseline if k not in fixtures]
+    return compare(reports + missing, baseline, float("inf"), max_fill_drop)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="offline provider parser benchmark")
+    ap.add_argument("--dir", action="append", default=None, help="픽스처 폴더 (여러 번 지정 가능)")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--browser", action="store_true", help="headless 페이지 경로도 측정")
+    ap.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    ap.add_argument("--baseline", help="이 파일과 비교해서 회귀면 exit 1")
+    ap.add_argument("--save-baseline", help="결과를 기준값으로 저장")
+    ap.add_argument("--max-slowdown", type=float, default=1.5)
+    ap.add_argument("--max-fill-drop", type=float, default=0.05)
+    ap.add_argument("--check", action="store_true", help="data/fixtures 채움 비율만 기준값과 비교 (측정 안 함)")
+    ap.add_argument("--update", action="store_true", help="--check와 같이: 기준값을 지금 결과로 갱신")
+    args = ap.parse_args(argv)
+
+    providers = _providers()
+
+    # ✅ 커밋된 픽스처로 채움 비율 회귀 확인 (--dir를 따로 주면 측정만)
+    problems: List[str] = []
+    if args.check or not args.dir:
+        problems = check_fixtures(providers, args.max_fill_drop, update=args.update)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if args.check:
+            return 1 if problems else 0
+
+    dirs = [Path(d) for d in args.dir] if args.dir else [FIXTURE_DIR, ROOT_DIR / "data" / "debug"]
+    fixtures = find_fixtures(dirs)
+    if not fixtures:
+        print(f"픽스처가 없습니다: {', '.join(str(d) for d in dirs)}")
+        return 2
+
+    reports: List[ProviderReport] = []
+    for key, paths in fixtures.items():
+        name = key.split("/")[0]
+        pages = [_read(p) for p in paths]
+        rep = bench_html(providers[name], key, pages, args.repeat)
+        if args.browser and key == name:
+            rep.browser_p50_ms = asyncio.run(bench_browser(providers[name], name, pages, args.repeat))
+        reports.append(rep)
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports], ensure_ascii=False, indent=2))
+    else:
+        print(f"{'provider':<10} {'files':>5} {'list':>5} {'p50ms':>8} {'p95ms':>8} {'peakKB':>8} "
+              f"{'price':>6} {'rating':>6} {'review':>6} {'loc':>6} {'brw_p50':>8}")
+        for r in reports:
+            f = r.fill
+            brw = "-" if r.browser_p50_ms is None else f"{r.browser_p50_ms:.2f}"
+            print(f"{r.provider:<10} {r.files:>5} {r.listings:>5} {r.p50_ms:>8.2f} {r.p95_ms:>8.2f} {r.peak_kb:>8.1f} "
+                  f"{f['price_total']:>6.0%} {f['rating']:>6.0%} {f['reviews']:>6.0%} {f['location_text']:>6.0%} {brw:>8}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(
+            json.dumps({r.provider: asdict(r) for r in reports}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        found = compare(reports, baseline, args.max_slowdown, args.max_fill_drop)
+        for p in found:
+            print(f"REGRESSION {p}")
+        problems += found
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
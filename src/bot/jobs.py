@@ -0,0 +1,180 @@
+from __future__ import annotations
+import asyncio
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from src.utils.logging import log
+from src.utils.metrics import METRICS, STAGE_HOOK
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+_ICON = {QUEUED: "⏳", RUNNING: "🔎", DONE: "✅", FAILED: "⚠️", CANCELLED: "🛑"}
+
+
+@dataclass
+class RunJob:
+    id: int
+    chat_id: int
+    label: str                      # "booking" 등
+    state: str = QUEUED
+    note: str = ""                  # 현재 단계 / 결과 요약
+    stages: Deque[str] = field(default_factory=lambda: deque(maxlen=4))  # 최근 끝난 단계
+    created: float = field(default_factory=time.monotonic)
+    started: float = 0.0
+    finished: float = 0.0
+    cancel_requested: bool = False
+    message: Any = field(default=None, repr=False)   # 제자리에서 고치는 상태 메시지
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    _dirty: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.state in (QUEUED, RUNNING)
+
+    def update(self, note: str) -> None:
+        self.note = note
+        self._dirty.set()
+
+    def text(self) -> str:
+        end = self.finished or time.monotonic()
+        took = f" {end - self.started:.0f}s" if self.started else ""
+        lines = [f"{_ICON[self.state]} #{self.id} {self.label} {self.state}{took}"]
+        if self.note:
+            lines.append(self.note)
+        if self.state == RUNNING and self.stages:
+            lines.append(" · ".join(self.stages))
+        return "\n".join(lines)
+
+
+# 작업 본문: job.update()로 진행 상황을 알리고, 끝나면 요약 문자열(상태 메시지 마지막 줄)을 돌려준다
+JobFn = Callable[[RunJob], Awaitable[str]]
+
+
+class JobManager:
+    """
+    봇 /run을 백그라운드 작업으로 실행한다.
+    - 채팅마다 한 번에 하나씩 (나머지는 순서대로 대기, per_chat_queue개까지), 전체 동시 실행은 max_running개
+    - 상태 메시지 하나를 단계가 끝날 때마다 고쳐 씀 (edit_interval초에 한 번 이하)
+    - cancel은 task를 취소 → 브라우저 page/context는 공급자 finally에서 닫힌다
+    """
+
+    def __init__(self, max_running: int = 2, per_chat_queue: int = 3, edit_interval: float = 1.5, keep: int = 20):
+        self.max_running = max(1, max_running)
+        self.per_chat_queue = max(1, per_chat_queue)
+        self.edit_interval = edit_interval
+        self._slots = asyncio.Semaphore(self.max_running)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._jobs: Dict[int, RunJob] = {}
+        self._done: Deque[int] = deque()
+        self._keep = keep
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def from_cfg(cls, cfg: Optional[Dict[str, Any]]) -> "JobManager":
+        cfg = cfg or {}
+        return cls(
+            max_running=int(cfg.get("max_running", 2)),
+            per_chat_queue=int(cfg.get("per_chat_queue", 3)),
+            edit_interval=float(cfg.get("edit_interval_sec", 1.5)),
+        )
+
+    # ---- 조회 ----
+    def for_chat(self, chat_id: int) -> List[RunJob]:
+        return [j for j in self._jobs.values() if j.chat_id == chat_id]
+
+    def get(self, job_id: int) -> Optional[RunJob]:
+        return self._jobs.get(job_id)
+
+    def running(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.state == RUNNING)
+
+    # ---- 실행 ----
+    async def submit(self, chat_id: int, label: str, work: JobFn, send: Callable[[str], Awaitable[Any]]) -> Optional[RunJob]:
+        """대기열이 꽉 찼으면 None. send로 상태 메시지를 보내고 그 메시지를 계속 고친다"""
+        waiting = [j for j in self.for_chat(chat_id) if j.active]
+        if len(waiting) >= self.per_chat_queue:
+            return None
+
+        job = RunJob(id=next(self._ids), chat_id=chat_id, label=label)
+        ahead = len(waiting)
+        job.note = f"앞에 {ahead}개 대기 중" if ahead else "곧 시작"
+        # 상태 메시지를 못 보냈으면(네트워크/flood 제한) 등록하지 않음 → 대기열 자리를 잡아두지 않게
+        job.message = await send(job.text())
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, work))
+        METRICS.inc("bot_jobs_total", state=QUEUED)
+        return job
+
+    async def _run(self, job: RunJob, work: JobFn) -> None:
+        editor = asyncio.create_task(self._edit_loop(job))
+        lock = self._chat_locks.setdefault(job.chat_id, asyncio.Lock())
+        try:
+            async with lock, self._slots:
+                job.state, job.started = RUNNING, time.monotonic()
+                job.update("검색 준비")
+                # 이 작업 안에서 끝나는 단계(goto/wait_cards/parse ...)를 상태 메시지에 표시
+                STAGE_HOOK.set(lambda provider, stage, sec: self._on_stage(job, provider, stage, sec))
+                job.note = await work(job)
+                job.state = DONE
+        except asyncio.CancelledError:
+            if job.cancel_requested:
+                job.state, job.note = CANCELLED, "취소됨"
+            else:
+                # 합류해 있던 공유 검색 자체가 (봇 종료 등으로) 취소된 경우
+                job.state, job.note = FAILED, "같이 받던 검색이 중단됐어요. 다시 /run 해주세요."
+        except Exception as e:
+            job.state, job.note = FAILED, f"{type(e).__name__}: {e}"
+            log(f"[bot] job #{job.id} failed: {job.note}")
+        finally:
+            job.finished = time.monotonic()
+            editor.cancel()
+            await asyncio.gather(editor, return_exceptions=True)
+            await self._edit(job)
+            METRICS.inc("bot_jobs_total", state=job.state)
+            self._retire(job)
+
+    def _on_stage(self, job: RunJob, provider: str, stage: str, sec: float) -> None:
+        job.stages.append(f"{stage} {sec:.1f}s")
+        job._dirty.set()
+
+    async def _edit_loop(self, job: RunJob) -> None:
+        while True:
+            await job._dirty.wait()
+            job._dirty.clear()
+            await self._edit(job)
+            await asyncio.sleep(self.edit_interval)  # 텔레그램 edit 속도 제한
+
+    async def _edit(self, job: RunJob) -> None:
+        if job.message is None:
+            return
+        try:
+            await job.message.edit_text(job.text())
+        except Exception as e:
+            # "message is not modified" 등 → 다음 갱신 때 다시
+            log(f"[bot] job #{job.id} status edit skipped: {type(e).__name__}")
+
+    def _retire(self, job: RunJob) -> None:
+        # 끝난 작업은 /jobs에서 보이게 최근 keep개만 남김
+        self._done.append(job.id)
+        while len(self._done) > self._keep:
+            self._jobs.pop(self._done.popleft(), None)
+
+    def cancel(self, job_id: int, chat_id: Optional[int] = None) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or not job.active or (chat_id is not None and job.chat_id != chat_id):
+            return False
+        job.cancel_requested = True
+        if job.task is not None:
+            job.task.cancel()
+        return True
+
+    async def shutdown(self) -> None:
+        tasks = [j.task for j in self._jobs.values() if j.active and j.task is not None]
+        for j in self._jobs.values():
+            if j.active:
+                j.cancel_requested = True
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,5 +1,6 @@
 from __future__ import annotations
-from urllib.parse import urlencode
+from typing import Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
 def booking_search_url(city: str, checkin: str, checkout: str, adults: int, children: int, rooms: int) -> str:
     # 가장 단순하고 안정적인 쿼리
@@ -42,4 +43,20 @@ def trip_search_url(city: str, checkin: str, checkout: str, adults: int, childre
         "children": children,
         "rooms": rooms,
     }
-    return "https://kr.trip.com/hotels/list?" + urlencode(params)
\ No newline at end of file
+    return "https://kr.trip.com/hotels/list?" + urlencode(params)
+
+def parse_stay_dates(url: str) -> Tuple[str, str]:
+    """
+    검색 URL에서 (checkin, checkout) 추출. 공급자마다 대소문자가 달라서 소문자로 비교.
+    (없으면 빈 문자열)
+    """
+    q = {k.lower(): v for k, v in parse_qsl(urlsplit(url).query)}
+    return q.get("checkin", ""), q.get("checkout", "")
+
+def search_key(target: str, city: str, checkin: str, checkout: str, adults: int, children: int, rooms: int) -> str:
+    """
+    같은 검색인지 판단하는 정규화 키 (공급자 + 도시 + 날짜 + 인원/객실).
+    도시는 공백/대소문자 차이를 무시한다. ("Sokcho " == "sokcho")
+    """
+    norm_city = " ".join(city.split()).casefold()
+    return f"{target}|{norm_city}|{checkin}|{checkout}|{int(adults)}|{int(children)}|{int(rooms)}"
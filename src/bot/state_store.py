@@ -1,8 +1,11 @@
 from __future__ import annotations
 import json
-from dataclasses import dataclass, asdict
+import os
+from dataclasses import dataclass, asdict, field, fields
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from src.app.rules import Rules
 
 @dataclass
 class SearchState:
@@ -17,24 +20,73 @@ class SearchState:
     min_rating: float = 8.0
     require_free_cancel: bool = False
     last_run: str = ""
+    # 구독: target(booking/agoda/trip) → 감시 주기(분). 봇 재시작 시 복구
+    watches: Dict[str, float] = field(default_factory=dict)
+
+    def rules(self) -> Rules:
+        return Rules(
+            min_total_price=self.min_total_price,
+            max_total_price=self.max_total_price,
+            min_rating=self.min_rating,
+            require_free_cancel=self.require_free_cancel,
+        )
+
+
+def _from_dict(data: Optional[Dict[str, Any]]) -> SearchState:
+    s = SearchState()
+    names = {f.name for f in fields(s)}
+    for k, v in (data or {}).items():
+        if k in names:
+            setattr(s, k, v)
+    return s
+
 
 class StateStore:
+    """
+    채팅별 검색 조건/구독 저장소.
+
+    파일 형식: {"default": {...}, "chats": {"<chat_id>": {...}}}
+    - 예전 형식(SearchState 하나짜리 dict)은 읽을 때 "default"로 옮긴다
+      → 기존 조건은 아직 /set 안 한 채팅들의 시작값이 된다.
+    """
+
     def __init__(self, path: str = "data/search_state.json"):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._data: Optional[Dict[str, Any]] = None
+
+    def _read(self) -> Dict[str, Any]:
+        if self._data is None:
+            data: Dict[str, Any] = {}
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8-sig"))
+            if "chats" not in data:
+                # ✅ 레거시 단일 상태 → default
+                data = {"default": data, "chats": {}}
+            self._data = data
+        return self._data
 
-    def load(self) -> SearchState:
-        if not self.path.exists():
-            return SearchState()
-        data: Dict[str, Any] = json.loads(self.path.read_text(encoding="utf-8-sig"))
-        s = SearchState()
-        for k, v in data.items():
-            if hasattr(s, k):
-                setattr(s, k, v)
+    def _write(self) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self._read(), ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def load(self, chat_id: Optional[int] = None) -> SearchState:
+        data = self._read()
+        if chat_id is not None and str(chat_id) in data["chats"]:
+            return _from_dict(data["chats"][str(chat_id)])
+        s = _from_dict(data.get("default"))
+        if chat_id is not None:
+            s.watches = {}  # default의 구독은 다른 채팅에 물려주지 않음
         return s
 
-    def save(self, state: SearchState) -> None:
-        self.path.write_text(
-            json.dumps(asdict(state), ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+    def save(self, state: SearchState, chat_id: Optional[int] = None) -> None:
+        data = self._read()
+        if chat_id is None:
+            data["default"] = asdict(state)
+        else:
+            data["chats"][str(chat_id)] = asdict(state)
+        self._write()
+
+    def chats(self) -> Dict[int, SearchState]:
+        return {int(k): _from_dict(v) for k, v in self._read()["chats"].items()}
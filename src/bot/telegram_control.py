@@ -1,7 +1,13 @@
-from __future__ import annotations
+﻿from __future__ import annotations
 
+import time
+_T0 = time.perf_counter()  # 시작 소요 시간(stage=startup) 기준
+
+import asyncio
 import os
 from pathlib import Path
+from dataclasses import replace
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -9,14 +15,26 @@ from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 
 from .state_store import StateStore
-from .query_builders import booking_search_url, agoda_search_url,trip_search_url
+from .watch_groups import WatchGroups, state_key
+from .jobs import JobManager, RunJob
 
-from src.app.rules import Rules, match_rules
-from src.app.formatter import format_msg
+from src.app.rules import match_rules, rules_key
+from src.app.formatter import format_history, format_msg, format_sweep
 
-from src.providers.booking import BookingProvider
-from src.providers.agoda import AgodaProvider
-from src.providers.trip import TripProvider
+from src.providers import registry
+from src.app.scheduler import WatchScheduler
+from src.app.shared_fetch import SharedFetcher
+from src.app.sweep import SweepSpec, run_sweep
+from src.app.circuit import CircuitBreaker, CircuitOpenError
+from src.app.runner import build_scheduler, load_settings, mark_startup, open_breaker, open_result_cache, open_seen_store
+from src.storage.seen_store import SeenStore
+from src.storage.price_history import PriceHistory
+from src.storage.result_cache import ResultCache, scoped_key
+from src.utils.http_pool import close_client
+from src.utils.logging import configure as configure_logging, log
+from src.utils.debug_dump import configure as configure_dumps, flush as flush_dumps
+from src.utils.metrics import METRICS, span
+from src.utils.paginate import accept_scope
 
 
 
@@ -28,6 +46,15 @@ load_dotenv(dotenv_path=ENV_PATH)
 
 
 store = StateStore(str(ROOT_DIR / "data" / "search_state.json"))
+scheduler: Optional[WatchScheduler] = None  # _on_startup에서 settings의 schedule 섹션으로 생성
+seen_stores: Dict[str, SeenStore] = {}
+fetcher = SharedFetcher()
+groups: Optional[WatchGroups] = None  # _on_startup에서 생성 (app.bot 필요)
+cache: Optional[ResultCache] = None
+breaker: Optional[CircuitBreaker] = None  # run_once와 같은 파일(data/circuit.json)을 공유
+settings: Dict[str, Any] = {}
+warmup: Optional[asyncio.Task] = None  # 백그라운드 Chromium 실행
+jobs = JobManager()  # /run 백그라운드 작업 (_on_startup에서 settings의 jobs 섹션으로 다시 생성)
 
 
 def _state_text(s) -> str:
@@ -45,7 +72,7 @@ def _state_text(s) -> str:
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    s = store.load()
+    s = store.load(update.effective_chat.id)
     await update.message.reply_text(
         "안녕하세요! 숙소 감시봇 컨트롤입니다.\n\n"
         "명령어:\n"
@@ -61,20 +88,34 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "/set freecancel on|off\n"
         "/run booking\n"
         "/run agoda\n"
+        "/run booking --fresh  (캐시 무시)\n"
+        "/jobs  (실행/대기 중인 /run)\n"
+        "/cancel 3  (작업 #3 취소)\n"
+        "/watch booking 30\n"
+        "/sweep booking 2026-03-01 2026-03-07 1,2\n"
+        "/unwatch all\n"
+        "/history 숙소이름 30\n"
+        "/stats\n"
     )
     await update.message.reply_text(_state_text(s))
 
 
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    s = store.load()
-    await update.message.reply_text(_state_text(s))
+    s = store.load(update.effective_chat.id)
+    text = _state_text(s)
+    if cache is not None:
+        text += f"\n- cache: {cache.stats()}"
+    if breaker is not None:
+        text += "\n- circuit: " + breaker.status_text().replace("\n", ", ")
+    await update.message.reply_text(text)
 
 
 async def set_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     /set key value...
     """
-    s = store.load()
+    chat_id = update.effective_chat.id
+    s = store.load(chat_id)
     if len(context.args) < 2:
         await update.message.reply_text("사용법: /set <key> <value>\n예: /set city 속초")
         return
@@ -109,80 +150,370 @@ async def set_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text("값 형식이 올바르지 않습니다. 예: /set rating 8.0")
         return
 
-    store.save(s)
+    store.save(s, chat_id)
+    # 감시 중이면 새 조건의 그룹으로 옮김
+    for target, minutes in s.watches.items():
+        groups.subscribe(chat_id, target, s, minutes)
     await update.message.reply_text("✅ 조건이 저장되었습니다.\n" + _state_text(s))
 
 
+def _resolve_target(target: str, s):
+    """target 이름 + 현재 조건 → (검색 URL, provider). 모르는 target이면 None"""
+    entry = registry.get(target)
+    if entry is None:
+        return None
+    # 공급자 모듈(Playwright 포함)은 이 target을 처음 쓸 때 import
+    url = entry.search_url(s.city, s.checkin, s.checkout, s.adults, s.children, s.rooms)
+    return url, entry.create(settings.get(target))
+
+
 async def run_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     /run booking | /run agoda | /run trip
+    /run booking --fresh  → 캐시 무시하고 새로 검색
+    검색은 백그라운드 작업으로 돌고, 진행 상황은 상태 메시지 하나를 고쳐 가며 보여준다 (/jobs, /cancel <id>)
     """
-    s = store.load()
-    target = (context.args[0].lower() if context.args else "booking")
+    chat_id = update.effective_chat.id
+    s = store.load(chat_id)
+    args = [a.lower() for a in (context.args or [])]
+    fresh = "--fresh" in args
+    args = [a for a in args if not a.startswith("--")]
+    target = (args[0] if args else "booking")
+
+    resolved = _resolve_target(target, s)
+    if resolved is None:
+        await update.message.reply_text(f"사용법: /run <{' | '.join(registry.names())}>")
+        return
+    url, provider = resolved
+
+    # 조건에 따라 일찍 멈추는 공급자면 같은 조건끼리만 캐시/합류 (다른 채팅의 짧은 결과를 받지 않게)
+    scope = accept_scope(provider, rules_key(s.rules()))
+    key = scoped_key(state_key(target, s), scope)
+    if breaker is not None and not fetcher.in_flight(key) and breaker.state(provider.name) == "open" \
+            and breaker.retry_in(provider.name) > 0:
+        await update.message.reply_text(
+            f"⛔ {target} 차단 감지로 쉬는 중이에요. 약 {int(breaker.retry_in(provider.name) // 60) + 1}분 후 다시 시도하세요."
+        )
+        return
 
-    rules = Rules(
-        min_total_price=s.min_total_price,
-        max_total_price=s.max_total_price,
-        min_rating=s.min_rating,
-        require_free_cancel=s.require_free_cancel,
-    )
+    async def work(job: RunJob) -> str:
+        # 명령 전체 시간 (대기 제외, 검색 + 답장)
+        with span("bot", "run_cmd"):
+            return await _run(update, job, target, s, url, provider, key, scope, fresh)
 
-    if target == "booking":
-        url = booking_search_url(
-                                    s.city,
-                                    s.checkin,
-                                    s.checkout,
-                                    s.adults,
-                                    s.children,
-                                    s.rooms,
-                                )
-        provider = BookingProvider()
-    elif target == "agoda":
-        url = agoda_search_url(
-                                    s.city,
-                                    s.checkin,
-                                    s.checkout,
-                                    s.adults,
-                                    s.children,
-                                    s.rooms,
-                                )
-        provider = AgodaProvider()
-    elif target == "trip":
-        url = trip_search_url(
-                                        s.city, 
-                                        s.checkin, 
-                                        s.checkout, 
-                                        s.adults, 
-                                        s.children, 
-                                        s.rooms
-                                    )
-        provider = TripProvider()
-    else:
-        await update.message.reply_text("사용법: /run booking 또는 /run agoda")
-        return
+    job = await jobs.submit(chat_id, target, work, update.message.reply_text)
+    if job is None:
+        await update.message.reply_text(
+            f"⏳ 이미 대기 중인 /run이 {jobs.per_chat_queue}개예요. /jobs 로 확인하고 /cancel <id> 로 취소할 수 있어요."
+        )
 
-    await update.message.reply_text(f"🔎 실행 시작: {target}\n{url}")
 
-    listings = await provider.fetch(url)
+async def _run(update: Update, job: RunJob, target: str, s, url: str, provider, key: str, scope: str, fresh: bool) -> str:
+    chat_id = update.effective_chat.id
+    rules = s.rules()
 
-    await update.message.reply_text(
-    f"📦 파싱 결과: listings={len(listings)} (target={target})"
-)
+    cached = None if (fresh or cache is None) else cache.get(url, scope)
+    if cached is not None:
+        listings = cached
+    else:
+        if fetcher.in_flight(key):
+            job.update(f"🔁 같은 검색이 이미 실행 중이라 결과를 같이 받아요\n{url}")
+        else:
+            job.update(f"검색 중\n{url}")
+
+        # 다른 채팅/감시가 같은 검색을 돌리는 중이면 브라우저를 새로 띄우지 않고 합류
+        run = lambda: provider.fetch(url, accept=lambda x: match_rules(x, rules))
+        try:
+            listings = await fetcher.fetch(
+                key, run if breaker is None else lambda: breaker.call(provider.name, run)
+            )
+        except CircuitOpenError as e:
+            # half-open 시험 쿼리가 이미 나가 있는 경우
+            return f"⛔ {e}"
+        if cache is not None:
+            cache.put(url, listings, scope)
 
     matched = [x for x in listings if match_rules(x, rules)]
-
-    await update.message.reply_text(
-    f"✅ 조건 통과: matched={len(matched)}"
-)
+    src = " ⚡캐시" if cached is not None else ""
+    summary = f"📦 listings={len(listings)}{src} → ✅ matched={len(matched)}"
+    job.update(summary)
 
     if not matched:
-        await update.message.reply_text("조건에 맞는 숙소가 아직 없어요. (또는 파싱이 안 됐을 수 있어요)")
+        summary += "\n조건에 맞는 숙소가 아직 없어요. (또는 파싱이 안 됐을 수 있어요)"
     else:
-        for x in matched[:5]:
-            await update.message.reply_text(format_msg(x))
+        with span("bot", "reply"):
+            for x in matched[:5]:
+                await update.message.reply_text(format_msg(x))
 
+    s = store.load(chat_id)  # 기다리는 동안 /set 됐을 수 있음
     s.last_run = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    store.save(s)
+    store.save(s, chat_id)
+    return summary
+
+
+async def jobs_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /jobs → 이 채팅의 /run 작업 (대기/실행 중 + 최근 끝난 것)
+    """
+    mine = jobs.for_chat(update.effective_chat.id)
+    if not mine:
+        await update.message.reply_text("작업이 없어요.")
+        return
+    lines = [f"🧾 작업 (전체 실행 중 {jobs.running()}/{jobs.max_running})"]
+    lines += [j.text().split("\n")[0] + (f" — {j.note}" if j.note else "") for j in mine[-10:]]
+    await update.message.reply_text("\n".join(lines)[:4000])
+
+
+async def cancel_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /cancel <id> → 대기 중이면 빼고, 실행 중이면 브라우저 작업까지 중단
+    """
+    args = context.args or []
+    try:
+        job_id = int(args[0].lstrip("#"))
+    except (IndexError, ValueError):
+        await update.message.reply_text("사용법: /cancel <id>  (id는 /jobs 에서 확인)")
+        return
+    if jobs.cancel(job_id, update.effective_chat.id):
+        await update.message.reply_text(f"🛑 #{job_id} 취소 요청했어요.")
+    else:
+        await update.message.reply_text(f"#{job_id}: 이 채팅에서 진행 중인 작업이 아니에요.")
+
+
+def _seen_store(target: str) -> SeenStore:
+    # run_once와 같은 파일 (봇 감시는 "chat_id:숙소id"로 채팅별 기록)
+    if target not in seen_stores:
+        seen_stores[target] = open_seen_store(settings, target, str(ROOT_DIR / "data"))
+    return seen_stores[target]
+
+
+async def watch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /watch                    → 감시 목록
+    /watch booking [주기(분)]  → 현재 조건으로 주기 감시 시작
+    """
+    chat_id = update.effective_chat.id
+    s = store.load(chat_id)
+    if not context.args:
+        mine = groups.for_chat(chat_id)
+        if not mine:
+            await update.message.reply_text("감시 중인 항목이 없어요. 예: /watch booking 30")
+            return
+        lines = ["👀 감시 목록"]
+        for g in mine:
+            j = groups.job(g.key)
+            last = "-" if j is None or j.last_count is None else f"{j.last_count}건"
+            err = f" ⚠️ {j.last_error}" if j is not None and j.last_error else ""
+            shared = f", {len(g.chats)}개 채팅 공유" if len(g.chats) > 1 else ""
+            lines.append(f"- {g.target}: {g.chats[chat_id][1]:g}분마다{shared}, 최근 {last}{err}")
+        await update.message.reply_text("\n".join(lines))
+        return
+
+    target = context.args[0].lower()
+    if _resolve_target(target, s) is None:
+        await update.message.reply_text("사용법: /watch booking|agoda|trip [주기(분)]")
+        return
+    try:
+        minutes = float(context.args[1]) if len(context.args) > 1 else 15.0
+    except ValueError:
+        await update.message.reply_text("주기는 분 단위 숫자로 입력하세요. 예: /watch booking 30")
+        return
+
+    minutes = max(1.0, minutes)
+    s.watches[target] = minutes
+    store.save(s, chat_id)
+    groups.subscribe(chat_id, target, s, minutes)
+    await update.message.reply_text(f"✅ 감시 시작: {target} ({minutes:g}분마다, 새 숙소만 알림)")
+
+
+async def unwatch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /unwatch booking | /unwatch all
+    """
+    chat_id = update.effective_chat.id
+    target = (context.args[0].lower() if context.args else "all")
+    removed = groups.unsubscribe(chat_id, None if target == "all" else target)
+
+    s = store.load(chat_id)
+    s.watches = {} if target == "all" else {k: v for k, v in s.watches.items() if k != target}
+    store.save(s, chat_id)
+    await update.message.reply_text(f"🛑 감시 중지: {removed}건")
+
+
+async def sweep_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /sweep booking [시작일] [끝일] [박수,박수]  → 날짜 격자 검색 + 최저가 표
+    (생략하면 시작일=현재 체크인, 나머지는 settings.yaml의 sweep 섹션)
+    """
+    chat_id = update.effective_chat.id
+    s = store.load(chat_id)
+    args = list(context.args or [])
+    target = args.pop(0).lower() if args else "booking"
+    resolved = _resolve_target(target, s)
+    if resolved is None:
+        await update.message.reply_text("사용법: /sweep booking|agoda|trip [시작일] [끝일] [박수,박수]")
+        return
+    _, provider = resolved
+
+    cfg = settings.get("sweep", {})
+    try:
+        spec = SweepSpec.from_cfg(
+            cfg,
+            start=args[0] if args else s.checkin,
+            end=args[1] if len(args) > 1 else None,
+            nights=tuple(int(n) for n in args[2].split(",")) if len(args) > 2 else None,
+        )
+        cells = spec.cells()
+    except ValueError:
+        await update.message.reply_text("날짜는 YYYY-MM-DD, 박수는 1,2 처럼 입력하세요.")
+        return
+    if not cells:
+        await update.message.reply_text("검색할 날짜가 없어요. 시작일/끝일을 확인하세요.")
+        return
+
+    await update.message.reply_text(f"🗓 스윕 시작: {target} {spec.start} ~ {spec.end}, {len(cells)}칸")
+
+    rules = s.rules()
+    res = await run_sweep(
+        provider,
+        lambda ci, co: _resolve_target(target, replace(s, checkin=ci, checkout=co))[0],
+        spec,
+        cache=cache,
+        concurrency=int(cfg.get("concurrency", 3)),
+        accept=lambda x: match_rules(x, rules),
+        breaker=breaker,
+        scope=accept_scope(provider, rules_key(rules)),
+    )
+
+    top = int(cfg.get("top", 5))
+    text = format_sweep(
+        f"{s.city} ({target})",
+        res.cells,
+        res.cheapest(),
+        [(res.titles[k], res.prices[k]) for k in res.top_hotels(top)],
+    )
+    if res.errors:
+        text += f"\n\n⚠️ 실패 {len(res.errors)}칸"
+    text += f"\n(캐시 재사용 {res.cached}/{len(res.cells)}칸)"
+    # 텔레그램 메시지 길이 제한(4096자)
+    await update.message.reply_text(text[:4000])
+
+
+async def history_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /history <숙소 이름 일부> [일수]  → 가격 추이 (기본 30일)
+    """
+    if not context.args:
+        await update.message.reply_text("사용법: /history <숙소 이름 일부> [일수]\n예: /history 롯데 30")
+        return
+
+    args = list(context.args)
+    days = 30.0
+    if len(args) > 1:
+        try:
+            days = float(args[-1])
+            args = args[:-1]
+        except ValueError:
+            pass
+
+    history = PriceHistory(str(ROOT_DIR / "data" / "price_history.sqlite3"))
+    try:
+        found = history.find(" ".join(args), limit=3)
+        if not found:
+            await update.message.reply_text("가격 기록이 없어요.")
+            return
+        since = datetime.now().timestamp() - days * 86400
+        msgs = []
+        for h in found:
+            # 최대 24구간으로 SQL에서 집계 → 몇 달치 기록도 바로 그림
+            points = history.series(h.key, since=since, buckets=24)
+            msgs.append(f"[{h.provider}] " + format_history(h.title, h.checkin, h.checkout, points, h.url))
+    finally:
+        history.close()
+
+    await update.message.reply_text("\n\n".join(msgs))
+
+
+async def stats_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /stats → 단계별 소요 시간(p50/p95)과 카운터
+    """
+    _export_metrics()
+    text = "📊 " + METRICS.summary()
+    if cache is not None:
+        text += f"\ncache: {cache.stats()}"
+    text += f"\nshared fetch: started={fetcher.started} joined={fetcher.joined}"
+    if breaker is not None:
+        text += f"\ncircuit:\n{breaker.status_text()}"
+    await update.message.reply_text(text[:4000])
+
+
+def _export_metrics() -> None:
+    path = settings.get("metrics", {}).get("path")
+    if path:
+        METRICS.write(str(ROOT_DIR / path))
+
+
+async def _warm_browser() -> None:
+    # Playwright import + Chromium 실행은 백그라운드에서 (그동안 명령은 바로 받음, 첫 /run은 lease에서 기다림)
+    from src.utils.playwright_pool import start_pool
+
+    try:
+        await start_pool(headless=True)
+    except Exception as e:
+        log(f"[bot] browser warmup failed: {type(e).__name__}: {e}")
+
+
+async def _on_startup(app: Application) -> None:
+    # ✅ 봇 시작 시 Chromium을 미리 띄워두고 /run 마다 재사용
+    global warmup
+    warmup = asyncio.create_task(_warm_browser())
+
+    global cache, settings, breaker
+    settings = load_settings(str(ROOT_DIR / "config" / "settings.yaml"))
+    configure_logging(settings.get("logging"))
+    configure_dumps(settings.get("debug_dump"))
+    cache = open_result_cache(settings, str(ROOT_DIR / "data" / "result_cache.sqlite3"))
+    breaker = open_breaker(settings, str(ROOT_DIR / "data" / "circuit.json"))
+    global jobs
+    jobs = JobManager.from_cfg(settings.get("jobs"))
+
+    async def send(chat_id: int, text: str) -> None:
+        await app.bot.send_message(chat_id=chat_id, text=text)
+
+    global groups, scheduler
+    scheduler = build_scheduler(settings)
+    groups = WatchGroups(scheduler, fetcher, _resolve_target, send, _seen_store, breaker)
+    # ✅ 저장된 구독 복구 (같은 검색끼리는 다시 한 그룹으로 묶임)
+    for chat_id, s in store.chats().items():
+        for target, minutes in s.watches.items():
+            groups.subscribe(chat_id, target, s, minutes)
+
+    async def write_metrics() -> int:
+        _export_metrics()
+        return 1
+
+    every = float(settings.get("metrics", {}).get("interval_sec", 60))
+    scheduler.add("metrics", every, write_metrics, first_delay=every)
+    scheduler.start()
+    mark_startup("bot", _T0)
+
+
+async def _on_shutdown(app: Application) -> None:
+    if scheduler is not None:
+        await scheduler.stop()
+    await jobs.shutdown()
+    await flush_dumps()
+    if warmup is not None:
+        await asyncio.gather(warmup, return_exceptions=True)
+    from src.utils.playwright_pool import shutdown_pool
+
+    await shutdown_pool()
+    await close_client()
+    for seen in seen_stores.values():
+        seen.close()
+    if cache is not None:
+        cache.close()
 
 
 def main() -> None:
@@ -193,11 +524,26 @@ def main() -> None:
             "예시:\nTG_TOKEN=봇토큰\nTG_CHAT_ID=채팅아이디"
         )
 
-    app = Application.builder().token(token).build()
+    app = (
+        Application.builder()
+        .token(token)
+        .post_init(_on_startup)
+        .post_shutdown(_on_shutdown)
+        # 여러 채팅의 /run이 동시에 돌아야 같은 검색에 합류할 수 있음
+        .concurrent_updates(True)
+        .build()
+    )
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("status", status))
     app.add_handler(CommandHandler("set", set_cmd))
     app.add_handler(CommandHandler("run", run_cmd))
+    app.add_handler(CommandHandler("watch", watch_cmd))
+    app.add_handler(CommandHandler("unwatch", unwatch_cmd))
+    app.add_handler(CommandHandler("sweep", sweep_cmd))
+    app.add_handler(CommandHandler("history", history_cmd))
+    app.add_handler(CommandHandler("stats", stats_cmd))
+    app.add_handler(CommandHandler("jobs", jobs_cmd))
+    app.add_handler(CommandHandler("cancel", cancel_cmd))
 
     # Polling 시작
     app.run_polling(close_loop=False)
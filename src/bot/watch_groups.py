@@ -0,0 +1,133 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.app.circuit import CircuitBreaker, CircuitOpenError
+from src.app.formatter import format_msg
+from src.app.rule_index import RuleIndex, Subscription
+from src.app.rules import rules_key
+from src.app.scheduler import WatchJob, WatchScheduler
+from src.app.shared_fetch import SharedFetcher
+from src.storage.result_cache import scoped_key
+from src.storage.seen_store import SeenStore
+from src.utils.paginate import accept_scope
+
+from .query_builders import search_key
+from .state_store import SearchState
+
+# target + 조건 → (url, provider) | None
+Resolver = Callable[[str, SearchState], Optional[Tuple[str, Any]]]
+Sender = Callable[[int, str], Awaitable[Any]]
+
+
+def state_key(target: str, s: SearchState) -> str:
+    return search_key(target, s.city, s.checkin, s.checkout, s.adults, s.children, s.rooms)
+
+
+@dataclass
+class WatchGroup:
+    key: str
+    target: str
+    url: str
+    provider: Any
+    # chat_id → (조건, 주기(분))
+    chats: Dict[int, Tuple[SearchState, float]] = field(default_factory=dict)
+
+    @property
+    def minutes(self) -> float:
+        return min(m for _, m in self.chats.values())
+
+
+class WatchGroups:
+    """
+    같은 정규화 검색(공급자/도시/날짜/인원)을 감시하는 채팅들을 한 그룹으로 묶는다.
+    그룹마다 스케줄러 job 하나 → 페이지는 한 번만 열고,
+    결과는 RuleIndex로 각 채팅의 가격/평점 조건에 맞춰 나눠 보낸다.
+    """
+
+    def __init__(
+        self,
+        scheduler: WatchScheduler,
+        fetcher: SharedFetcher,
+        resolve: Resolver,
+        send: Sender,
+        seen_store: Callable[[str], SeenStore],
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.scheduler = scheduler
+        self.fetcher = fetcher
+        self.resolve = resolve
+        self.send = send
+        self.seen_store = seen_store
+        self.breaker = breaker
+        self._groups: Dict[str, WatchGroup] = {}
+
+    def subscribe(self, chat_id: int, target: str, s: SearchState, minutes: float) -> Optional[WatchGroup]:
+        resolved = self.resolve(target, s)
+        if resolved is None:
+            return None
+        self.unsubscribe(chat_id, target)
+
+        key = state_key(target, s)
+        g = self._groups.get(key)
+        if g is None:
+            url, provider = resolved
+            g = self._groups[key] = WatchGroup(key=key, target=target, url=url, provider=provider)
+        g.chats[chat_id] = (s, max(1.0, minutes))
+
+        job = self.job(key)
+        if job is None:
+            self.scheduler.add(key, g.minutes * 60, self._job(key))
+        else:
+            # 이미 돌고 있는 그룹 → 주기만 가장 짧은 구독에 맞춤 (다음 예약은 그대로)
+            job.interval = g.minutes * 60
+        return g
+
+    def unsubscribe(self, chat_id: int, target: Optional[str] = None) -> int:
+        removed = 0
+        for key, g in list(self._groups.items()):
+            if chat_id not in g.chats or (target is not None and g.target != target):
+                continue
+            del g.chats[chat_id]
+            removed += 1
+            if not g.chats:
+                del self._groups[key]
+                self.scheduler.remove(key)
+            elif (job := self.job(key)) is not None:
+                job.interval = g.minutes * 60
+        return removed
+
+    def for_chat(self, chat_id: int) -> List[WatchGroup]:
+        return [g for g in self._groups.values() if chat_id in g.chats]
+
+    def job(self, key: str) -> Optional[WatchJob]:
+        return next((j for j in self.scheduler.jobs() if j.key == key), None)
+
+    def _job(self, key: str):
+        async def job() -> Optional[int]:
+            g = self._groups.get(key)
+            if g is None:
+                return 0
+            index = RuleIndex(
+                Subscription(id=str(chat_id), rules=s.rules(), chat_id=chat_id)
+                for chat_id, (s, _) in g.chats.items()
+            )
+            # /run 이 같은 검색(+같은 조건)을 돌리는 중이면 그 결과에 합류
+            # (다음 페이지는 어느 구독 조건이든 맞는 숙소가 나오는 동안만 → 조건 묶음이 다르면 합류 안 함)
+            scope = accept_scope(g.provider, "+".join(sorted({rules_key(s.rules()) for s, _ in g.chats.values()})))
+            run = lambda: g.provider.fetch(g.url, accept=lambda x: bool(index.match(x)))
+            try:
+                listings = await self.fetcher.fetch(
+                    scoped_key(key, scope), run if self.breaker is None else lambda: self.breaker.call(g.provider.name, run)
+                )
+            except CircuitOpenError:
+                # 차단 대기 중 → 이번 회차는 조용히 건너뜀 (None: 스케줄러가 0건/실패로 세지 않음)
+                return None
+            seen = self.seen_store(g.target)
+            # 이미 본 숙소는 채팅별로 따로 기록 → 한 채팅에 보냈다고 다른 채팅이 놓치지 않음
+            for x, sub in index.match_batch(listings):
+                if seen.add(f"{sub.chat_id}:{x.id}"):
+                    await self.send(sub.chat_id, format_msg(x))
+            return len(listings)
+
+        return job
@@ -1,9 +1,10 @@
 ﻿import asyncio
-from app.runner import run_once
+from src.app.runner import run_once
 
 if __name__ == "__main__":
     asyncio.run(run_once())
 
-# 실행을 위해서는 다음과 같이 해야함
+# 실행을 위해서는 다음과 같이 해야함 (프로젝트 루트에서)
+# python -m src.main            (1회 실행)
 # python -m src.bot.telegram_control
 # 취소는 ctrl + c 
\ No newline at end of file
@@ -1,13 +1,59 @@
 ﻿from __future__ import annotations
+import asyncio
 import os
-import requests
+import time
+from typing import Dict, Optional
+import httpx
+from src.utils.logging import log
+from src.utils.metrics import METRICS, span
+
+
+class _TokenBucket:
+    """rate개/초로 채워지는 토큰 버킷 (burst개까지 모아둘 수 있음)"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    def _take(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
 
 
 class TelegramNotifier:
-    def __init__(self):
+    """
+    비동기 텔레그램 전송기.
+    - send()는 큐에 넣기만 하고 바로 반환 (이벤트 루프를 막지 않음)
+    - 채팅별 워커가 순서대로 전송, keep-alive 연결 재사용
+    - 토큰 버킷으로 채팅별(기본 1건/초) + 전체(기본 25건/초) 속도 제한
+    - 429면 retry_after 만큼 쉬었다가 재시도
+    - aclose()에서 남은 메시지를 모두 보내고 종료
+    """
+
+    def __init__(
+        self,
+        chat_id: Optional[str] = None,
+        per_chat_rate: float = 1.0,
+        global_rate: float = 25.0,
+        max_retries: int = 5,
+    ):
         # 환경변수에서 텔레그램 봇 토큰과 채팅 ID를 읽어온다
         self.token = os.getenv("TG_TOKEN")
-        self.chat_id = os.getenv("TG_CHAT_ID")
+        self.chat_id = chat_id or os.getenv("TG_CHAT_ID")
 
         # 둘 중 하나라도 없으면 실행 중단
         if not self.token or not self.chat_id:
@@ -19,24 +65,109 @@ class TelegramNotifier:
                 "TG_CHAT_ID=채팅아이디"
             )
 
-    def send(self, text: str) -> None:
-        # 텔레그램 메시지 전송 API 주소 생성
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-
-        # POST 요청으로 메시지 전송
-        response = requests.post(
-            url,
-            json={
-                "chat_id": self.chat_id,
-                "text": text,
-                "disable_web_page_preview": False,  # 링크 미리보기 허용
-            },
-            timeout=15,
-        )
-
-        # 응답 코드가 200이 아니면 오류 발생
-        if response.status_code != 200:
+        # 텔레그램 메시지 전송 API 주소
+        self.url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+
+        self._global = _TokenBucket(global_rate, burst=global_rate)
+        self._chat_buckets: Dict[str, _TokenBucket] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self.sent = 0
+        self.failed = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=15,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._client
+
+    def send(self, text: str, chat_id: Optional[str] = None) -> None:
+        chat = str(chat_id or self.chat_id)
+        q = self._queues.get(chat)
+        if q is None:
+            q = self._queues[chat] = asyncio.Queue()
+            self._chat_buckets[chat] = _TokenBucket(self.per_chat_rate)
+            self._workers[chat] = asyncio.get_running_loop().create_task(self._worker(chat, q))
+        q.put_nowait(text)
+
+    async def _worker(self, chat: str, q: asyncio.Queue) -> None:
+        while True:
+            text = await q.get()
+            try:
+                with span("telegram", "send"):
+                    await self._deliver(chat, text)
+                METRICS.inc("telegram_sent_total")
+            except Exception as e:
+                self.failed += 1
+                METRICS.inc("telegram_failed_total")
+                log(f"[telegram] 전송 실패: {type(e).__name__}: {e}")
+            finally:
+                q.task_done()
+
+    async def _deliver(self, chat: str, text: str) -> None:
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            await self._chat_buckets[chat].acquire()
+            await self._global.acquire()
+            try:
+                response = await client.post(
+                    self.url,
+                    json={
+                        "chat_id": chat,
+                        "text": text,
+                        "disable_web_page_preview": False,  # 링크 미리보기 허용
+                    },
+                )
+            except httpx.TransportError:
+                await asyncio.sleep(min(30, 2 ** attempt))
+                continue
+
+            if response.status_code == 200:
+                self.sent += 1
+                return
+
+            if response.status_code == 429:
+                # 텔레그램이 알려준 만큼 대기 후 재시도
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                await asyncio.sleep(float(retry_after))
+                continue
+
+            if response.status_code >= 500:
+                await asyncio.sleep(min(30, 2 ** attempt))
+                continue
+
+            # 4xx(429 제외)는 재시도해도 소용없음
             raise RuntimeError(
                 f"텔레그램 전송 실패: {response.status_code}\n"
                 f"응답 내용: {response.text}"
             )
+
+        raise RuntimeError(f"텔레그램 전송 실패: 재시도 {self.max_retries}회 초과")
+
+    async def flush(self, timeout: Optional[float] = None) -> None:
+        """큐에 남은 메시지가 모두 전송될 때까지 대기"""
+        waits = [q.join() for q in self._queues.values()]
+        if waits:
+            await asyncio.wait_for(asyncio.gather(*waits), timeout=timeout)
+
+    async def aclose(self, timeout: Optional[float] = 120) -> None:
+        try:
+            await self.flush(timeout=timeout)
+        except asyncio.TimeoutError:
+            log(f"[telegram] 종료 시 미전송 메시지 있음: {sum(q.qsize() for q in self._queues.values())}")
+        for t in self._workers.values():
+            t.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
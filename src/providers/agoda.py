@@ -1,11 +1,21 @@
 ﻿from __future__ import annotations
 import re
-from typing import List, Optional
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
 from urllib.parse import urljoin
 from playwright.async_api import Page
 from src.providers.base import Listing
 from urllib.parse import urlparse
 from src.utils.playwright_pool import browser_context
+from src.utils.listing_id import listing_id
+from src.utils.extract import Field, Row, extract_cards, extract_cards_html
+from src.utils.net_block import BlockProfile
+from src.utils.xhr_capture import ResponseCapture, dig, find_list, first, to_float, to_int
+from src.utils.logging import log
+from src.utils.metrics import span, timed_fetch
+from src.utils.block_detect import check_page
+from src.utils.page_wait import StableWait, wait_until_stable
+from src.utils.paginate import Accept, PageOpts, scroll_pages
 
 def _to_int_price(text: str) -> Optional[int]:
     nums = re.findall(r"\d[\d,]*", text.replace(".", ""))
@@ -17,88 +27,101 @@ def _to_float_rating(text: str) -> Optional[float]:
     m = re.search(r"(\d+(?:\.\d+)?)", text)
     return float(m.group(1)) if m else None
 
-async def scroll_a_bit(page, max_scrolls=8):
-    last_height = await page.evaluate("document.body.scrollHeight")
-
-    for _ in range(max_scrolls):
-        await page.mouse.wheel(0, 3000)
-        await page.wait_for_timeout(800)
-
-        new_height = await page.evaluate("document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
-
-
-
 AGODA_ORIGIN = "https://www.agoda.com"
 
+# 카드 selector 후보 (앞쪽 우선)
+CARD_CANDIDATES = [
+    'div[data-selenium="hotel-item"]',
+    'li[data-selenium="hotel-item"]',
+    '[data-element-name="hotel-card"]',
+    'div[property="itemListElement"]',
+]
+
+# 카드 한 장에서 뽑을 필드 (selector, attribute) — 한 번의 evaluate로 전부 추출
+CARD_FIELDS: Dict[str, Field] = {
+    "title": ('[data-selenium="hotel-name"], [data-testid="hotel-name"]', None),
+    "href": ('a[href*="hotel"], a[href*="accommodation"]', "href"),
+    "price": ('[data-selenium="display-price"], [data-selenium="price"], [data-testid="price"]', None),
+    "rating": ('[data-selenium="hotel-rating"], span[data-selenium="review-score"], [data-testid="review-score"]', None),
+}
+
+# 검색 결과를 내려주는 내부 API (GraphQL citySearch 등)
+API_PATTERNS = ("/graphql/search", "/api/cronos/search", "/api/searchresult")
+
 class AgodaProvider:
     name = "agoda"
 
-    async def _parse(self, page: Page, base_url: str) -> List[Listing]:
-            # ✅ 렌더링 대기 + 스크롤
-        try:
-            await page.wait_for_load_state("networkidle", timeout=25000)
-        except Exception:
-            pass
-        await scroll_a_bit(page)
-        
-        
-        
-        
-        # ✅ 카드가 뜰 때까지 기다림 (여러 후보 중 하나라도)
-        candidates = [
-            'div[data-selenium="hotel-item"]',
-            'li[data-selenium="hotel-item"]',
-            '[data-element-name="hotel-card"]',
-            'div[property="itemListElement"]',
-        ]
-
-        found_sel = None
-        for sel in candidates:
-            try:
-                await page.wait_for_selector(sel, timeout=15000)
-                found_sel = sel
-                break
-            except Exception:
-                pass
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        # cfg: settings.yaml의 agoda 섹션 (없으면 기본값)
+        self.cfg = cfg or {}
+        self.block = BlockProfile.from_cfg(self.name, self.cfg.get("block"))
+        self.wait = StableWait.from_cfg(self.cfg.get("wait"), max_wait_ms=25000, scroll_step=3000)
+
+        # 결과 목록이 무한 스크롤이라 "다음 페이지" = 같은 탭에서 더 내려서 다음 묶음 받기 (scroll_pages)
+        self.pages = PageOpts.from_cfg(self.cfg.get("pages"))
+        self.xhr_timeout_ms = int(self.cfg.get("xhr_timeout_ms", 15000))
+
+    async def _parse(self, page: Page, base_url: str, accept: Optional[Accept] = None) -> List[Listing]:
+        # ✅ 카드가 뜰 때까지 기다림 (여러 후보 중 하나라도) + 카드 수가 안정될 때까지
+        with span(self.name, "wait_cards"):
+            stable = await wait_until_stable(page, CARD_CANDIDATES, self.wait)
+        found_sel = stable.selector
 
         if not found_sel:
-            # 캡차/차단 여부 간단 감지
-            html = await page.content()
-            if any(k in html.lower() for k in ["captcha", "verify", "access denied", "bot"]):
-                raise RuntimeError("Agoda 차단/캡차 페이지로 보입니다 (headless/UA 이슈 가능).")
+            # 캡차/차단이면 BlockedError (회로 차단기가 이 공급자를 잠시 쉬게 함)
+            await check_page(self.name, page)
             return []
 
-        # ✅ 스크롤로 추가 로드 유도 (3~5회 정도)
-        for _ in range(4):
-            await page.mouse.wheel(0, 2500)
-            await page.wait_for_timeout(800)
-
-        cards = await page.query_selector_all(found_sel)
+        async def cards() -> List[Listing]:
+            with span(self.name, "extract"):
+                rows = await extract_cards(page, found_sel, CARD_FIELDS, limit=self.pages.max_listings)
+            with span(self.name, "parse"):
+                return self._build(rows, page.url)
+
+        shown = stable.count
+
+        async def more(i: int) -> List[Listing]:
+            # 지금 카드 수 + 한 묶음이 보일 때까지 (카드 수가 멈추면 wait_until_stable이 스크롤)
+            nonlocal shown
+            with span(self.name, "scroll_more"):
+                r = await wait_until_stable(page, [found_sel], replace(self.wait, target_cards=shown + self.wait.target_cards))
+            if r.count <= shown:
+                return []
+            shown = r.count
+            return await cards()
+
+        return await scroll_pages(self.name, await cards(), more, self.pages, accept)
+
+    async def _more_xhr(self, page: Page, capture: ResponseCapture, i: int) -> List[Listing]:
+        # 목록 끝까지 내리면 같은 검색 API가 다음 묶음을 내려줌
+        with span(self.name, "scroll_more"):
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            return await capture.wait_batch(i, self.xhr_timeout_ms)
+
+    def parse_html(self, html: str, base_url: str) -> List[Listing]:
+        """저장된 HTML을 브라우저 없이 파싱"""
+        _, rows = extract_cards_html(html, CARD_CANDIDATES, CARD_FIELDS, limit=25)
+        return self._build(rows, base_url)
+
+    def _build(self, rows: List[Row], page_url: str) -> List[Listing]:
         out: List[Listing] = []
 
         # base_url은 검색URL 말고 origin 사용 추천
         base = AGODA_ORIGIN
 
-        for i, c in enumerate(cards[:25]):
-            title_el = await c.query_selector('[data-selenium="hotel-name"], [data-testid="hotel-name"]')
-            title = (await title_el.inner_text()).strip() if title_el else f"listing-{i}"
-
-            link_el = await c.query_selector('a[href*="hotel"], a[href*="accommodation"]')
-            href = await link_el.get_attribute("href") if link_el else None
-            url = urljoin(base, href) if href else page.url
+        for i, r in enumerate(rows):
+            title = (r.get("title") or "").strip() or f"listing-{i}"
 
-            _id = re.sub(r"[^a-zA-Z0-9]+", "_", url)[:120]
+            href = r.get("href")
+            if not href:
+                # 상세 링크 없는 카드는 건너뜀 (검색 URL로 id를 만들면 모든 검색에서 같은 id가 돼서 알림이 막힘)
+                continue
+            url = urljoin(base, href)
 
-            price_el = await c.query_selector('[data-selenium="display-price"], [data-selenium="price"], [data-testid="price"]')
-            price_text = (await price_el.inner_text()) if price_el else ""
-            price_total = _to_int_price(price_text)
+            _id = listing_id(self.name, url)
 
-            rating_el = await c.query_selector('[data-selenium="hotel-rating"], span[data-selenium="review-score"], [data-testid="review-score"]')
-            rating_text = (await rating_el.inner_text()) if rating_el else ""
-            rating = _to_float_rating(rating_text)
+            price_total = _to_int_price(r.get("price") or "")
+            rating = _to_float_rating(r.get("rating") or "")
 
             out.append(Listing(
                 provider=self.name,
@@ -113,16 +136,81 @@ class AgodaProvider:
             ))
         return out
 
-    async def fetch(self, url: str) -> List[Listing]:
-        async with browser_context(headless=True) as ctx:
+    def _decode_api(self, data: Any) -> List[Listing]:
+        """검색 API JSON → Listing (정확한 총액/평점/후기수/무료취소)"""
+        out: List[Listing] = []
+        for prop in find_list(data, ("properties",)):
+            pid = first(prop.get("propertyId"), dig(prop, "content", "informationSummary", "propertyId"))
+            info = dig(prop, "content", "informationSummary") or {}
+            title = first(info.get("localeName"), info.get("defaultName"), info.get("displayName"))
+            if pid is None or not title:
+                continue
+
+            link = first(dig(info, "propertyLinks", "propertyPage"), f"/hotel/{pid}.html")
+            url = urljoin(AGODA_ORIGIN, link)
+            _id = listing_id(self.name, url)
+
+            room = dig(prop, "pricing", "offers", 0, "roomOffers", 0, "room") or {}
+            price_total = to_int(first(
+                dig(room, "pricing", 0, "price", "perBook", "inclusive", "display"),
+                dig(room, "pricing", 0, "price", "perBook", "exclusive", "display"),
+            ))
+
+            review = first(dig(prop, "content", "reviews", "cumulative"),
+                           dig(prop, "content", "reviews", "contentReview", 0, "cumulative")) or {}
+
+            cancel = first(dig(room, "payment", "cancellation", "cancellationType"),
+                           dig(room, "cancellationPolicy", "cancellationType"))
+            free_cancel = None if cancel is None else ("free" in str(cancel).lower())
+
+            area = first(dig(info, "address", "area", "name"), dig(info, "address", "city", "name"))
+
+            out.append(Listing(
+                provider=self.name,
+                id=_id,
+                title=str(title).strip(),
+                url=url,
+                price_total=price_total,
+                rating=to_float(review.get("score")),
+                reviews=to_int(review.get("reviewCount")),
+                free_cancel=free_cancel,
+                location_text=area,
+            ))
+        return out
+
+    @timed_fetch
+    async def fetch(self, url: str, accept: Optional[Accept] = None) -> List[Listing]:
+        async with browser_context(headless=True, block=self.block) as ctx:
             page = await ctx.new_page()
 
             # ✅ 아고다용 세팅(가능하면 browser_context 쪽으로 올리는 게 더 좋음)
             await page.set_viewport_size({"width": 1280, "height": 800})
 
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            # ✅ mode=auto: 검색 API 응답(JSON)을 먼저 기다리고, 없으면 DOM 파싱으로
+            capture = None
+            if self.cfg.get("mode", "auto") != "dom":
+                capture = ResponseCapture(API_PATTERNS, self._decode_api)
+                capture.attach(page)
+
+            with span(self.name, "goto"):
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            # ✅ 캡차/차단이면 networkidle/카드 대기에 시간 쓰기 전에 바로 중단
+            await check_page(self.name, page, response, early=True)
+
+            if capture is not None:
+                with span(self.name, "xhr_wait"):
+                    listings = await capture.wait(self.xhr_timeout_ms)
+                if listings:
+                    log(f"[{self.name}] xhr listings={len(listings)}")
+                    # 다음 묶음도 API로: 묶음마다 accept 확인 → 조건 맞는 게 안 나오면 그만 내림
+                    return await scroll_pages(
+                        self.name, listings, lambda i: self._more_xhr(page, capture, i), self.pages, accept,
+                    )
+                log(f"[{self.name}] xhr miss (matched={capture.matched}) -> DOM fallback")
+
             try:
-                await page.wait_for_load_state("networkidle", timeout=30000)
+                with span(self.name, "networkidle"):
+                    await page.wait_for_load_state("networkidle", timeout=30000)
             except Exception:
                 pass
 
@@ -135,4 +223,4 @@ class AgodaProvider:
                     except Exception:
                         pass
 
-            return await self._parse(page, base_url=url)
+            return await self._parse(page, base_url=url, accept=accept)
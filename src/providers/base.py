@@ -1,6 +1,6 @@
 ﻿from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, Protocol, List
+from typing import Callable, Optional, Protocol, List
 
 @dataclass(frozen=True)
 class Listing:
@@ -14,7 +14,16 @@ class Listing:
     free_cancel: Optional[bool] = None
     location_text: Optional[str] = None
 
+class BlockedError(RuntimeError):
+    """공급자가 캡차/차단 페이지를 내려줌 (재시도해도 소용없고 더 막힐 수 있음)"""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider} 차단/캡차 감지: {reason}")
+        self.provider = provider
+        self.reason = reason
+
 class Provider(Protocol):
     name: str
-    async def fetch(self, url: str) -> List[Listing]:
+    # accept: 조건 통과 여부 (페이지를 넘길 때 조건 맞는 숙소가 안 나오면 중단하는 데 사용)
+    async def fetch(self, url: str, accept: Optional[Callable[[Listing], bool]] = None) -> List[Listing]:
         ...
@@ -1,10 +1,22 @@
 ﻿from __future__ import annotations
+import asyncio
 import re
-from typing import List, Optional
+import httpx
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
 from urllib.parse import urljoin
-from playwright.async_api import Page
+from playwright.async_api import BrowserContext, Page
 from src.providers.base import Listing
 from src.utils.playwright_pool import browser_context
+from src.utils.listing_id import listing_id
+from src.utils.extract import Field, Row, extract_cards, extract_cards_html
+from src.utils.net_block import BlockProfile
+from src.utils.page_wait import StableWait, wait_until_stable
+from src.utils.paginate import Accept, PageOpts, crawl_pages, with_param
+from src.utils.http_pool import get_client
+from src.utils.logging import log
+from src.utils.metrics import METRICS, span, timed_fetch
+from src.utils.block_detect import check_page, classify_block
 
 def _to_int_price(text: str) -> Optional[int]:
     nums = re.findall(r"\d[\d,]*", text.replace(".", ""))
@@ -16,49 +28,77 @@ def _to_float_rating(text: str) -> Optional[float]:
     m = re.search(r"(\d+(?:\.\d+)?)", text)
     return float(m.group(1)) if m else None
 
+CARD_SELECTOR = '[data-testid="property-card"]'
+CARD_CANDIDATES = [CARD_SELECTOR]
+
+# 카드 한 장에서 뽑을 필드 (selector, attribute) — 한 번의 evaluate로 전부 추출
+CARD_FIELDS: Dict[str, Field] = {
+    "title": ('[data-testid="title"]', None),
+    "href": ('a[data-testid="title-link"]', "href"),
+    "price": ('[data-testid="price-and-discounted-price"]', None),
+    "score": ('[data-testid="review-score"]', None),
+    "address": ('[data-testid="address"]', None),
+}
+
+# 검색 결과 한 페이지 카드 수 (offset 파라미터 단위)
+PAGE_SIZE = 25
+
 class BookingProvider:
     name = "booking"
 
-    async def _parse(self, page: Page, base_url: str) -> List[Listing]:
-        cards = await page.query_selector_all('[data-testid="property-card"]')
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        # cfg: settings.yaml의 booking 섹션 (없으면 기본값)
+        self.cfg = cfg or {}
+        self.block = BlockProfile.from_cfg(self.name, self.cfg.get("block"))
+        self.wait = StableWait.from_cfg(self.cfg.get("wait"))
+        self.pages = PageOpts.from_cfg(self.cfg.get("pages"))
 
-        # ✅ cards=0이면 디버그 저장
-        if not cards:
+    async def _parse(self, page: Page, base_url: str, dump: bool = True) -> List[Listing]:
+        with span(self.name, "extract"):
+            rows = await extract_cards(page, CARD_SELECTOR, CARD_FIELDS, limit=PAGE_SIZE)
+
+        # ✅ cards=0이면 디버그 저장 (2페이지부터는 결과 끝일 수 있어서 덤프 안 함)
+        if not rows and dump:
             from src.utils.debug_dump import dump_page
             await dump_page(page, "booking_zero")
+        if not rows:
             return []
 
+        with span(self.name, "parse"):
+            return self._build(rows, base_url)
+
+    def parse_html(self, html: str, base_url: str) -> List[Listing]:
+        """저장된/서버 렌더링 HTML을 브라우저 없이 파싱"""
+        _, rows = extract_cards_html(html, CARD_CANDIDATES, CARD_FIELDS, limit=PAGE_SIZE)
+        return self._build(rows, base_url)
+
+    def _build(self, rows: List[Row], base_url: str) -> List[Listing]:
         out: List[Listing] = []
 
-        for i, c in enumerate(cards[:25]):
-            title_el = await c.query_selector('[data-testid="title"]')
-            title = (await title_el.inner_text()).strip() if title_el else f"listing-{i}"
+        for i, r in enumerate(rows):
+            title = (r.get("title") or "").strip() or f"listing-{i}"
 
-            link_el = await c.query_selector('a[data-testid="title-link"]')
-            href = await link_el.get_attribute("href") if link_el else None
-            url = urljoin(base_url, href) if href else base_url
+            href = r.get("href")
+            if not href:
+                # 상세 링크 없는 카드는 건너뜀 (검색 URL로 id를 만들면 모든 검색에서 같은 id가 돼서 알림이 막힘)
+                continue
+            url = urljoin(base_url, href)
 
-            _id = re.sub(r"[^a-zA-Z0-9]+", "_", url)[:120]
+            _id = listing_id(self.name, url)
 
-            price_el = await c.query_selector('[data-testid="price-and-discounted-price"]')
-            price_text = (await price_el.inner_text()) if price_el else ""
-            price_total = _to_int_price(price_text)
+            price_total = _to_int_price(r.get("price") or "")
 
-            rating_el = await c.query_selector('[data-testid="review-score"]')
-            rating_text = (await rating_el.inner_text()).strip() if rating_el else ""
+            rating_text = (r.get("score") or "").strip()
             rating = _to_float_rating(rating_text)
 
             # (참고) reviews 파싱은 booking의 review-score 텍스트 구조가 바뀌어서
             # 지금 로직이 부정확할 수 있음. 일단 유지.
             reviews = None
-            if rating_el:
-                t = (await rating_el.inner_text())
-                m = re.search(r"(\d[\d,]*)", t)
-                if m:
-                    reviews = int(m.group(1).replace(",", ""))
+            m = re.search(r"(\d[\d,]*)", rating_text)
+            if m:
+                reviews = int(m.group(1).replace(",", ""))
 
-            loc_el = await c.query_selector('[data-testid="address"]')
-            loc = (await loc_el.inner_text()).strip() if loc_el else None
+            loc = (r.get("address") or "").strip() or None
 
             out.append(Listing(
                 provider=self.name,
@@ -73,15 +113,59 @@ class BookingProvider:
             ))
         return out
 
-    async def fetch(self, url: str) -> List[Listing]:
-        async with browser_context(headless=True) as ctx:
-            page = await ctx.new_page()
+    async def _fetch_http(self, url: str) -> Optional[List[Listing]]:
+        """
+        브라우저 없이 GET + lxml 파싱 (서버 렌더링된 property-card 사용).
+        동의/봇 차단 페이지이거나 카드가 없으면 None → Playwright 경로로 폴백.
+        """
+        try:
+            with span(self.name, "http_get"):
+                r = await get_client().get(url)
+        except httpx.HTTPError as e:
+            log(f"[{self.name}] fast path error: {type(e).__name__} -> browser")
+            return None
+
+        if r.status_code != 200:
+            log(f"[{self.name}] fast path status={r.status_code} -> browser")
+            return None
+
+        html = r.text
+        # 파싱은 CPU 작업이라 스레드로 (이벤트 루프 안 막기)
+        with span(self.name, "parse"):
+            listings = await asyncio.to_thread(self.parse_html, html, str(r.url))
+        if listings:
+            log(f"[{self.name}] fast path listings={len(listings)}")
+            return listings
+
+        # HTTP만 막힌 경우가 많아서 차단이어도 브라우저로 한 번 더 시도
+        reason = classify_block(html)
+        if reason:
+            METRICS.inc("blocked_pages_total", provider=self.name, path="http")
+        log(f"[{self.name}] fast path miss ({reason or 'no cards'}) -> browser")
+        return None
+
+    def page_url(self, url: str, i: int) -> str:
+        """i번째 추가 페이지 URL (offset=25*i, 원래 offset이 있으면 거기서부터)"""
+        q = dict(parse_qsl(urlsplit(url).query))
+        try:
+            start = int(q.get("offset", 0))
+        except ValueError:
+            start = 0
+        return with_param(url, "offset", start + PAGE_SIZE * i)
+
+    async def _fetch_tab(self, ctx: BrowserContext, url: str, first: bool = True) -> List[Listing]:
+        page = await ctx.new_page()
+        try:
             await page.set_viewport_size({"width": 1280, "height": 800})
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            with span(self.name, "goto"):
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            # ✅ 캡차/차단이면 networkidle/카드 대기에 시간 쓰기 전에 바로 중단
+            await check_page(self.name, page, response, early=True)
 
             # ✅ 렌더링/요청 안정화
             try:
-                await page.wait_for_load_state("networkidle", timeout=30000)
+                with span(self.name, "networkidle"):
+                    await page.wait_for_load_state("networkidle", timeout=30000)
             except Exception:
                 pass
 
@@ -94,17 +178,39 @@ class BookingProvider:
                     except Exception:
                         pass
 
-            # ✅ 스크롤로 카드 로드 유도
-            for _ in range(3):
-                await page.mouse.wheel(0, 2500)
-                await page.wait_for_timeout(700)
-
-            # ✅ 카드가 뜰 때까지 기다림 (안 뜨면 덤프)
-            try:
-                await page.wait_for_selector('[data-testid="property-card"]', timeout=15000)
-            except Exception:
-                from src.utils.debug_dump import dump_page
-                await dump_page(page, "booking_no_cards")
+            # ✅ 카드가 뜨고 개수가 안정될 때까지 대기 (안 뜨면 덤프)
+            # (스크롤/selector 대기는 wait_until_stable 안에서 함께 → stage=wait_cards)
+            with span(self.name, "wait_cards"):
+                found = (await wait_until_stable(page, [CARD_SELECTOR], self.wait)).selector
+            if not found:
+                await check_page(self.name, page)
+                if first:
+                    from src.utils.debug_dump import dump_page
+                    await dump_page(page, "booking_no_cards")
                 return []
 
-            return await self._parse(page, base_url=url)
+            return await self._parse(page, base_url=url, dump=first)
+        finally:
+            await page.close()
+
+    @timed_fetch
+    async def fetch(self, url: str, accept: Optional[Accept] = None) -> List[Listing]:
+        next_url = lambda i: self.page_url(url, i)
+
+        # ✅ fast_path: 먼저 HTTP로 시도하고, 안 되면 브라우저
+        if self.cfg.get("fast_path", True):
+            listings = await self._fetch_http(url)
+            if listings is not None:
+                # 다음 페이지들도 HTTP로 (막히면 그 페이지는 빈 결과 → 거기서 중단)
+                async def http_page(u: str) -> List[Listing]:
+                    return await self._fetch_http(u) or []
+                return await crawl_pages(self.name, listings, next_url, http_page, self.pages, accept)
+
+        async with browser_context(headless=True, block=self.block) as ctx:
+            first = await self._fetch_tab(ctx, url)
+            # ✅ 2페이지부터는 같은 context의 탭 여러 개로 동시에
+            return await crawl_pages(
+                self.name, first, next_url,
+                lambda u: self._fetch_tab(ctx, u, first=False),
+                self.pages, accept,
+            )
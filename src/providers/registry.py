@@ -0,0 +1,66 @@
+from __future__ import annotations
+import importlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# 공급자 모듈은 Playwright까지 끌고 오므로 처음 쓸 때 import (봇/러너 시작이 빨라짐)
+
+
+@dataclass(frozen=True)
+class ProviderEntry:
+    name: str
+    provider: str   # "모듈:클래스"
+    url_builder: str  # "모듈:함수" (도시/날짜/인원 → 검색 URL)
+
+    def load(self) -> type:
+        return _resolve(self.provider)
+
+    def create(self, cfg: Optional[Dict[str, Any]] = None) -> Any:
+        return self.load()(cfg)
+
+    def search_url(self, city: str, checkin: str, checkout: str, adults: int, children: int, rooms: int) -> str:
+        build: Callable[..., str] = _resolve(self.url_builder)
+        return build(city, checkin, checkout, adults, children, rooms)
+
+
+REGISTRY: Dict[str, ProviderEntry] = {
+    e.name: e
+    for e in (
+        ProviderEntry("booking", "src.providers.booking:BookingProvider", "src.bot.query_builders:booking_search_url"),
+        ProviderEntry("agoda", "src.providers.agoda:AgodaProvider", "src.bot.query_builders:agoda_search_url"),
+        ProviderEntry("trip", "src.providers.trip:TripProvider", "src.bot.query_builders:trip_search_url"),
+    )
+}
+
+
+def _resolve(path: str) -> Any:
+    module, attr = path.split(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def names() -> List[str]:
+    return list(REGISTRY)
+
+
+def get(name: str) -> Optional[ProviderEntry]:
+    return REGISTRY.get(name)
+
+
+def create(name: str, cfg: Optional[Dict[str, Any]] = None) -> Any:
+    entry = REGISTRY.get(name)
+    if entry is None:
+        raise KeyError(f"unknown provider: {name} (known: {', '.join(REGISTRY)})")
+    return entry.create(cfg)
+
+
+def build_enabled(settings: Dict[str, Any]) -> List[Any]:
+    """
+    settings.yaml에서 enabled이고 queries가 있는 공급자만 만든다 (run_once / src.watch / 워커).
+    쿼리가 없는 공급자는 모듈도 import하지 않음.
+    """
+    out = []
+    for name, entry in REGISTRY.items():
+        cfg = settings.get(name) or {}
+        if cfg.get("enabled", True) and cfg.get("queries"):
+            out.append(entry.create(cfg))
+    return out
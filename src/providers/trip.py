@@ -1,10 +1,20 @@
 from __future__ import annotations
 import re
-from typing import List, Optional
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
 from urllib.parse import urljoin
 from playwright.async_api import Page
 from src.providers.base import Listing
 from src.utils.playwright_pool import browser_context
+from src.utils.listing_id import listing_id
+from src.utils.extract import Field, Row, extract_cards, extract_cards_html
+from src.utils.net_block import BlockProfile
+from src.utils.xhr_capture import ResponseCapture, dig, find_list, first, to_float, to_int
+from src.utils.logging import log
+from src.utils.metrics import span, timed_fetch
+from src.utils.block_detect import check_page
+from src.utils.page_wait import StableWait, wait_until_stable
+from src.utils.paginate import Accept, PageOpts, scroll_pages
 
 def _to_int_price(text: str) -> Optional[int]:
     nums = re.findall(r"\d[\d,]*", text.replace(".", ""))
@@ -16,81 +26,125 @@ def _to_float_rating(text: str) -> Optional[float]:
     m = re.search(r"(\d+(?:\.\d+)?)", text)
     return float(m.group(1)) if m else None
 
+# 카드가 뜰 때까지 기다릴 후보 셀렉터들 (앞쪽 우선)
+CARD_CANDIDATES = [
+    "[data-testid='hotel-card']",
+    "[data-testid='property-card']",
+    "div[property='itemListElement']",
+    "a[href*='/hotels/']",
+]
+
+# 카드 한 장에서 뽑을 필드 (selector, attribute) — 한 번의 evaluate로 전부 추출
+# (Trip.com DOM은 자주 바뀜 → price/rating 후보를 넓게)
+CARD_FIELDS: Dict[str, Field] = {
+    "title": ("h2, h3, [data-testid='hotel-name']", None),
+    "self_href": ("", "href"),
+    "link_href": ("a[href]", "href"),
+    "price": ("[data-testid='price'], [class*='price'], [class*='Price']", None),
+    "rating": ("[data-testid='rating'], [class*='score'], [class*='Score']", None),
+}
+
+TRIP_ORIGIN = "https://kr.trip.com"
+
+# 호텔 목록을 내려주는 내부 API (fetchHotelList / getHotelList 계열)
+API_PATTERNS = ("fetchHotelList", "getHotelList", "/htls/", "HotelSearch")
+
 class TripProvider:
     name = "trip"
 
-    async def _parse(self, page: Page, base_url: str) -> List[Listing]:
-        # ✅ 1) 카드가 뜰 때까지 기다릴 후보 셀렉터들
-        candidates = [
-            "[data-testid='hotel-card']",
-            "[data-testid='property-card']",
-            "div[property='itemListElement']",
-            "a[href*='/hotels/']",
-        ]
-
-        found_sel = None
-        for sel in candidates:
-            try:
-                await page.wait_for_selector(sel, timeout=15000)
-                found_sel = sel
-                break
-            except Exception:
-                pass
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        # cfg: settings.yaml의 trip 섹션 (없으면 기본값)
+        self.cfg = cfg or {}
+        self.block = BlockProfile.from_cfg(self.name, self.cfg.get("block"))
+        self.wait = StableWait.from_cfg(self.cfg.get("wait"))
+
+        # 결과 목록이 무한 스크롤이라 "다음 페이지" = 같은 탭에서 더 내려서 카드 더 받기
+        self.pages = PageOpts.from_cfg(self.cfg.get("pages"))
+        self.xhr_timeout_ms = int(self.cfg.get("xhr_timeout_ms", 15000))
+
+    async def _parse(self, page: Page, base_url: str, accept: Optional[Accept] = None) -> List[Listing]:
+        # ✅ 1) 후보 중 먼저 잡히는 selector 기준으로 카드 수가 안정될 때까지 대기
+        with span(self.name, "wait_cards"):
+            stable = await wait_until_stable(page, CARD_CANDIDATES, self.wait)
+        found_sel = stable.selector
 
         # ✅ 2) 아무것도 못 찾으면: 차단/캡차 가능성 → 디버그 덤프
         if not found_sel:
             from src.utils.debug_dump import dump_page
             await dump_page(page, "trip_no_selector")
 
-            html = (await page.content()).lower()
-            if any(k in html for k in ["captcha", "verify", "access denied", "bot"]):
-                # 차단 화면이면 여기서 멈춤
-                return []
+            # 차단 화면이면 BlockedError (예전엔 빈 결과로 조용히 끝났음)
+            await check_page(self.name, page)
             return []
 
         # ✅ 3) 카드 목록 가져오기 (selector가 a면 링크 기준으로 카드처럼 처리)
-        nodes = await page.query_selector_all(found_sel)
-        if not nodes:
+        with span(self.name, "extract"):
+            rows = await extract_cards(page, found_sel, CARD_FIELDS, limit=self.pages.max_listings)
+        if not rows:
             from src.utils.debug_dump import dump_page
             await dump_page(page, "trip_zero")
             return []
 
+        with span(self.name, "parse"):
+            out = self._build(rows, base_url)
+
+        # ✅ 4) 결과가 0이면 페이지를 덤프해둔다 (selector는 맞는데 파싱이 틀린 경우)
+        if not out:
+            from src.utils.debug_dump import dump_page
+            await dump_page(page, "trip_parsed_zero")
+            return out
+
+        # ✅ 5) 무한 스크롤: 지금 카드 수 + 한 묶음이 보일 때까지 더 내려서 다음 묶음 (카드 수가 멈추면 wait_until_stable이 스크롤)
+        shown = stable.count
+
+        async def more(i: int) -> List[Listing]:
+            nonlocal shown
+            with span(self.name, "scroll_more"):
+                r = await wait_until_stable(page, [found_sel], replace(self.wait, target_cards=shown + self.wait.target_cards))
+            if r.count <= shown:
+                return []
+            shown = r.count
+            with span(self.name, "extract"):
+                rows = await extract_cards(page, found_sel, CARD_FIELDS, limit=self.pages.max_listings)
+            with span(self.name, "parse"):
+                return self._build(rows, base_url)
+
+        return await scroll_pages(self.name, out, more, self.pages, accept)
+
+    async def _more_xhr(self, page: Page, capture: ResponseCapture, i: int) -> List[Listing]:
+        # 목록 끝까지 내리면 같은 호텔 목록 API가 다음 묶음을 내려줌
+        with span(self.name, "scroll_more"):
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            return await capture.wait_batch(i, self.xhr_timeout_ms)
+
+    def parse_html(self, html: str, base_url: str) -> List[Listing]:
+        """저장된 HTML을 브라우저 없이 파싱"""
+        _, rows = extract_cards_html(html, CARD_CANDIDATES, CARD_FIELDS, limit=25)
+        return self._build(rows, base_url)
+
+    def _build(self, rows: List[Row], base_url: str) -> List[Listing]:
         out: List[Listing] = []
 
-        # 링크 기반 selector면 중복 제거를 위해 href set 사용
+        # 링크 기반 selector면 중복 제거 (같은 호텔의 다른 링크도 id가 같음)
         seen = set()
 
-        for i, n in enumerate(nodes[:25]):
+        for i, r in enumerate(rows):
             # title
-            title_el = await n.query_selector("h2, h3, [data-testid='hotel-name']")
-            title = (await title_el.inner_text()).strip() if title_el else f"listing-{i}"
-
-            # link
-            link_el = n
-            href = await link_el.get_attribute("href")
-            if not href:
-                a = await n.query_selector("a[href]")
-                href = await a.get_attribute("href") if a else None
+            title = (r.get("title") or "").strip() or f"listing-{i}"
 
+            # link (카드 자신이 a면 그 href, 아니면 안쪽 첫 링크)
+            href = r.get("self_href") or r.get("link_href")
             if not href:
                 continue
 
             url = urljoin(base_url, href)
-            if url in seen:
+            _id = listing_id(self.name, url)
+            if _id in seen:
                 continue
-            seen.add(url)
-
-            _id = re.sub(r"[^a-zA-Z0-9]+", "_", url)[:120]
+            seen.add(_id)
 
-            # price (Trip.com DOM은 자주 바뀜 → 후보로 넓게)
-            price_el = await n.query_selector("[data-testid='price'], [class*='price'], [class*='Price']")
-            price_text = (await price_el.inner_text()) if price_el else ""
-            price_total = _to_int_price(price_text)
-
-            # rating
-            rating_el = await n.query_selector("[data-testid='rating'], [class*='score'], [class*='Score']")
-            rating_text = (await rating_el.inner_text()) if rating_el else ""
-            rating = _to_float_rating(rating_text)
+            price_total = _to_int_price(r.get("price") or "")
+            rating = _to_float_rating(r.get("rating") or "")
 
             out.append(Listing(
                 provider=self.name,
@@ -103,31 +157,83 @@ class TripProvider:
                 free_cancel=None,
                 location_text=None,
             ))
+        return out
 
-        # ✅ 4) 결과가 0이면 페이지를 덤프해둔다 (selector는 맞는데 파싱이 틀린 경우)
-        if not out:
-            from src.utils.debug_dump import dump_page
-            await dump_page(page, "trip_parsed_zero")
+    def _decode_api(self, data: Any) -> List[Listing]:
+        """호텔 목록 API JSON → Listing (스키마 버전별 후보 키를 모두 시도)"""
+        out: List[Listing] = []
+        for h in find_list(data, ("hotelList", "hotels")):
+            basic = first(h.get("hotelBasicInfo"), dig(h, "hotelInfo", "summary")) or {}
+            hid = first(basic.get("hotelId"), h.get("hotelId"))
+            title = first(basic.get("hotelName"), dig(h, "hotelInfo", "nameInfo", "name"), h.get("hotelName"))
+            if hid is None or not title:
+                continue
+
+            url = f"{TRIP_ORIGIN}/hotels/detail/?hotelId={hid}"
+            _id = listing_id(self.name, url)
+
+            room = first(dig(h, "roomInfo", 0), h.get("roomInfo")) or {}
+            if not isinstance(room, dict):
+                room = {}
+            price_total = to_int(first(
+                dig(room, "priceInfo", "totalPrice"),
+                dig(room, "priceInfo", "price"),
+                dig(room, "priceInfo", "displayPrice"),
+                basic.get("price"),
+            ))
+
+            comment = first(h.get("commentInfo"), dig(h, "hotelInfo", "commentInfo")) or {}
+            cancel = first(dig(room, "cancelPolicy", "freeCancel"), room.get("freeCancel"), h.get("freeCancel"))
+            loc = first(dig(h, "positionInfo", "positionDesc"), dig(h, "positionInfo", "positionName"),
+                        dig(h, "hotelInfo", "positionInfo", "positionDesc"))
 
+            out.append(Listing(
+                provider=self.name,
+                id=_id,
+                title=str(title).strip(),
+                url=url,
+                price_total=price_total,
+                rating=to_float(comment.get("commentScore")),
+                reviews=to_int(comment.get("commenterNumber")),
+                free_cancel=None if cancel is None else bool(cancel),
+                location_text=loc,
+            ))
         return out
 
-    async def fetch(self, url: str) -> List[Listing]:
-        async with browser_context(headless=True) as ctx:
+    @timed_fetch
+    async def fetch(self, url: str, accept: Optional[Accept] = None) -> List[Listing]:
+        async with browser_context(headless=True, block=self.block) as ctx:
             page = await ctx.new_page()
             await page.set_viewport_size({"width": 1280, "height": 800})
 
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            # ✅ mode=auto: 호텔 목록 API 응답(JSON)을 먼저 기다리고, 없으면 DOM 파싱으로
+            capture = None
+            if self.cfg.get("mode", "auto") != "dom":
+                capture = ResponseCapture(API_PATTERNS, self._decode_api)
+                capture.attach(page)
+
+            with span(self.name, "goto"):
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            # ✅ 캡차/차단이면 networkidle/카드 대기에 시간 쓰기 전에 바로 중단
+            await check_page(self.name, page, response, early=True)
+
+            if capture is not None:
+                with span(self.name, "xhr_wait"):
+                    listings = await capture.wait(self.xhr_timeout_ms)
+                if listings:
+                    log(f"[{self.name}] xhr listings={len(listings)}")
+                    # 다음 묶음도 API로: 묶음마다 accept 확인 → 조건 맞는 게 안 나오면 그만 내림
+                    return await scroll_pages(
+                        self.name, listings, lambda i: self._more_xhr(page, capture, i), self.pages, accept,
+                    )
+                log(f"[{self.name}] xhr miss (matched={capture.matched}) -> DOM fallback")
 
             # ✅ 1) 렌더링 안정화
             try:
-                await page.wait_for_load_state("networkidle", timeout=30000)
+                with span(self.name, "networkidle"):
+                    await page.wait_for_load_state("networkidle", timeout=30000)
             except Exception:
                 pass
 
-            # ✅ 2) 스크롤로 로딩 유도
-            for _ in range(3):
-                await page.mouse.wheel(0, 2500)
-                await page.wait_for_timeout(700)
-
-            # ✅ 3) 파싱
-            return await self._parse(page, base_url=url)
+            # ✅ 2) 파싱 (카드 대기/스크롤은 _parse의 wait_until_stable에서)
+            return await self._parse(page, base_url=url, accept=accept)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.providers.base import Listing
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listing (
+    key        INTEGER PRIMARY KEY,
+    provider   TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    checkin    TEXT NOT NULL,
+    checkout   TEXT NOT NULL,
+    title      TEXT NOT NULL,
+    url        TEXT NOT NULL,
+    UNIQUE (provider, listing_id, checkin, checkout)
+);
+CREATE TABLE IF NOT EXISTS price (
+    key   INTEGER NOT NULL,
+    ts    INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    PRIMARY KEY (key, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS notified (
+    key   INTEGER PRIMARY KEY,
+    ts    INTEGER NOT NULL,
+    price INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+HOUR = 3600
+DAY = 86400
+
+
+@dataclass(frozen=True)
+class HistoryKey:
+    key: int
+    provider: str
+    listing_id: str
+    checkin: str
+    checkout: str
+    title: str
+    url: str
+
+
+class PriceHistory:
+    """
+    (provider, listing id, checkin, checkout)별 가격 시계열 (SQLite, append-only).
+    - 가격이 그대로면 heartbeat 간격(기본 1시간)까지는 새 점을 안 찍는다
+    - 보존: raw_days까지는 원본, hourly_days까지는 시간당 최저가, 그 이후는 하루 최저가
+    - 키당 max_points개를 넘으면 오래된 점부터 삭제
+    - 정리(compact)는 하루에 한 번, 열 때 자동으로
+    """
+
+    def __init__(
+        self,
+        path: str = "data/price_history.sqlite3",
+        raw_days: float = 7,
+        hourly_days: float = 60,
+        max_points: int = 2000,
+        heartbeat: float = HOUR,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.max_points = max_points
+        self.heartbeat = heartbeat
+
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(_SCHEMA)
+
+        last = self._conn.execute("SELECT value FROM meta WHERE name = 'compacted'").fetchone()
+        if last is None or time.time() - last[0] > DAY:
+            self.compact()
+
+    # ---- 쓰기 ----
+    def _key(self, x: Listing, checkin: str, checkout: str) -> int:
+        self._conn.execute(
+            "INSERT OR IGNORE INTO listing (provider, listing_id, checkin, checkout, title, url) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (x.provider, x.id, checkin, checkout, x.title, x.url),
+        )
+        return self._conn.execute(
+            "SELECT key FROM listing WHERE provider = ? AND listing_id = ? AND checkin = ? AND checkout = ?",
+            (x.provider, x.id, checkin, checkout),
+        ).fetchone()[0]
+
+    def record_many(
+        self,
+        listings: Iterable[Listing],
+        checkin: str,
+        checkout: str,
+        now: Optional[float] = None,
+        record: bool = True,
+        window: float = 0,
+    ) -> Dict[str, Optional[int]]:
+        """
+        가격이 있는 Listing들의 현재가를 기록하고, id별 하락 비교 기준가를 돌려준다 (처음이면 None).
+        - window > 0: 최근 window초 안에 알린 가격이 있으면 그 가격, 없으면 그 기간 최고가
+          (조금씩 내리는 가격도 누적 하락으로 잡힘)
+        - window = 0: 직전 가격
+        한 번의 트랜잭션으로 처리. record=False면 기준가만 조회 (캐시에서 꺼낸 결과는 새 관측이 아님)
+        """
+        ts = int(time.time() if now is None else now)
+        prev: Dict[str, Optional[int]] = {}
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for x in listings:
+                if x.price_total is None:
+                    continue
+                key = self._key(x, checkin, checkout)
+                row = self._conn.execute(
+                    "SELECT ts, price FROM price WHERE key = ? ORDER BY ts DESC LIMIT 1", (key,)
+                ).fetchone()
+                prev[x.id] = self._reference(key, ts - window) if window > 0 else (row[1] if row else None)
+                if not record:
+                    continue
+                if row and row[1] == x.price_total and ts - row[0] < self.heartbeat:
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO price (key, ts, price) VALUES (?, ?, ?)",
+                    (key, ts, x.price_total),
+                )
+        return prev
+
+    def _reference(self, key: int, since: float) -> Optional[int]:
+        notified = self._conn.execute(
+            "SELECT price FROM notified WHERE key = ? AND ts >= ?", (key, int(since))
+        ).fetchone()
+        if notified is not None:
+            return notified[0]
+        points = self.series(key, since=since)
+        return max((p for _, p in points), default=None)
+
+    def mark_notified(self, x: Listing, checkin: str, checkout: str, now: Optional[float] = None) -> None:
+        """이 가격으로 알림을 보냈음 → 다음 하락 알림은 여기서 더 내려야 (window 안에서)"""
+        if x.price_total is None:
+            return
+        ts = int(time.time() if now is None else now)
+        with self._conn:
+            key = self._key(x, checkin, checkout)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO notified (key, ts, price) VALUES (?, ?, ?)", (key, ts, x.price_total)
+            )
+
+    # ---- 정리 ----
+    def _downsample(self, older_than: float, newer_than: float, bucket: int) -> None:
+        hi, lo = int(older_than), int(newer_than)
+        self._conn.execute("DROP TABLE IF EXISTS temp.agg")
+        self._conn.execute(
+            "CREATE TEMP TABLE agg AS "
+            "SELECT key, (ts / ?) * ? AS ts, MIN(price) AS price FROM price "
+            "WHERE ts < ? AND ts >= ? GROUP BY key, ts / ?",
+            (bucket, bucket, hi, lo, bucket),
+        )
+        self._conn.execute("DELETE FROM price WHERE ts < ? AND ts >= ?", (hi, lo))
+        self._conn.execute("INSERT OR REPLACE INTO price (key, ts, price) SELECT key, ts, price FROM temp.agg")
+        self._conn.execute("DROP TABLE temp.agg")
+
+    def compact(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        raw_cut = now - self.raw_days * DAY
+        hourly_cut = now - self.hourly_days * DAY
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._downsample(raw_cut, hourly_cut, HOUR)
+            self._downsample(hourly_cut, 0, DAY)
+            self._conn.execute(
+                "DELETE FROM price WHERE (key, ts) IN ("
+                " SELECT key, ts FROM ("
+                "  SELECT key, ts, ROW_NUMBER() OVER (PARTITION BY key ORDER BY ts DESC) AS rn FROM price"
+                " ) WHERE rn > ?)",
+                (self.max_points,),
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('compacted', ?)", (now,))
+
+    # ---- 읽기 ----
+    def find(self, text: str, limit: int = 5) -> List[HistoryKey]:
+        """제목에 text가 들어간 시계열 (최근 기록 순)"""
+        rows = self._conn.execute(
+            "SELECT l.key, l.provider, l.listing_id, l.checkin, l.checkout, l.title, l.url "
+            "FROM listing l JOIN (SELECT key, MAX(ts) AS last FROM price GROUP BY key) p ON p.key = l.key "
+            "WHERE l.title LIKE ? ORDER BY p.last DESC LIMIT ?",
+            (f"%{text}%", limit),
+        ).fetchall()
+        return [HistoryKey(*r) for r in rows]
+
+    def series(self, key: int, since: Optional[float] = None, buckets: int = 0) -> List[Tuple[int, int]]:
+        """
+        (ts, price) 목록. buckets > 0이면 since~now를 그 개수로 나눠 구간별 최저가만 (SQL에서 집계).
+        """
+        since_ts = int(since or 0)
+        if buckets <= 0:
+            return self._conn.execute(
+                "SELECT ts, price FROM price WHERE key = ? AND ts >= ? ORDER BY ts", (key, since_ts)
+            ).fetchall()
+        if not since_ts:
+            row = self._conn.execute("SELECT MIN(ts) FROM price WHERE key = ?", (key,)).fetchone()
+            since_ts = row[0] or 0
+        width = max(1, int((time.time() - since_ts) // buckets) + 1)
+        return self._conn.execute(
+            "SELECT MIN(ts), MIN(price) FROM price WHERE key = ? AND ts >= ? "
+            "GROUP BY (ts - ?) / ? ORDER BY 1",
+            (key, since_ts, since_ts, width),
+        ).fetchall()
+
+    def close(self) -> None:
+        self._conn.close()
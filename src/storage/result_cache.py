@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.providers.base import Listing
+
+# query_builders가 넣는 기본값 → 있든 없든 같은 검색으로 취급
+_DEFAULT_PARAMS: Dict[str, Dict[str, str]] = {
+    "booking.com": {"group_children": "0", "no_rooms": "1"},
+    "agoda.com": {"children": "0", "rooms": "1", "locale": "ko-kr", "currency": "krw"},
+    "trip.com": {"children": "0", "rooms": "1"},
+}
+
+# 결과에 영향 없는 추적/세션 파라미터
+_IGNORED_PARAMS = {"aid", "label", "sid", "srpvid", "fbclid", "gclid"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS result (
+    key      TEXT PRIMARY KEY,
+    ts       REAL NOT NULL,
+    listings TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def canonical_url(url: str) -> str:
+    """
+    검색 URL 정규화: 호스트 소문자, 끝 '/' 제거, 파라미터 이름순 정렬,
+    빈 값/추적 파라미터/기본값 파라미터 제거.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    defaults = next((d for site, d in _DEFAULT_PARAMS.items() if host == site or host.endswith("." + site)), {})
+
+    params = []
+    for k, v in parse_qsl(parts.query, keep_blank_values=True):
+        v = v.strip()
+        if not v or k.lower() in _IGNORED_PARAMS or k.lower().startswith("utm_"):
+            continue
+        if defaults.get(k) == v.lower():
+            continue
+        params.append((k, v))
+    params.sort()
+
+    return urlunsplit((parts.scheme.lower() or "https", host, parts.path.rstrip("/") or "/", urlencode(params), ""))
+
+
+def scoped_key(key: str, scope: str = "") -> str:
+    """캐시/합류 키 + 조건 서명 (accept로 일찍 멈춘 결과는 같은 조건끼리만 공유)"""
+    return f"{key}#{scope}" if scope else key
+
+
+class ResultCache:
+    """
+    검색 결과(List[Listing]) 캐시: 정규화 URL → (저장 시각, 결과).
+    - ttl 초가 지나면 무효, max_entries를 넘으면 가장 오래 안 쓴 것부터 버림 (LRU)
+    - path가 있으면 SQLite에도 기록 → 재시작해도 TTL 안의 결과는 재사용
+    - 0건 결과는 저장하지 않음 (차단/파싱 실패일 수 있음)
+    - scope: 조건 서명 (paginate.accept_scope). 조건에 따라 일찍 멈춘 결과를 다른 조건에 돌려주지 않게
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 256, path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._mem: "OrderedDict[str, Tuple[float, List[Listing]]]" = OrderedDict()
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            p = Path(path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(p), timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=30000")
+            self._conn.executescript(_SCHEMA)
+            self._load()
+
+    def _load(self) -> None:
+        now = time.time()
+        self._conn.execute("DELETE FROM result WHERE ts < ?", (now - self.ttl,))
+        rows = self._conn.execute(
+            "SELECT key, ts, listings FROM result ORDER BY ts DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        for key, ts, data in reversed(rows):
+            self._mem[key] = (ts, [Listing(**d) for d in json.loads(data)])
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+    def get(self, url: str, scope: str = "") -> Optional[List[Listing]]:
+        key = scoped_key(canonical_url(url), scope)
+        item = self._mem.get(key)
+        if item is None or time.time() - item[0] > self.ttl:
+            if item is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._mem.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, url: str, listings: List[Listing], scope: str = "") -> None:
+        if not listings:
+            return
+        key = scoped_key(canonical_url(url), scope)
+        now = time.time()
+        self._mem[key] = (now, list(listings))
+        self._mem.move_to_end(key)
+        if self._conn is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result(key, ts, listings) VALUES (?, ?, ?)",
+                (key, now, json.dumps([asdict(x) for x in listings], ensure_ascii=False)),
+            )
+        while len(self._mem) > self.max_entries:
+            self._drop(next(iter(self._mem)))
+
+    def _drop(self, key: str) -> None:
+        self._mem.pop(key, None)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM result WHERE key = ?", (key,))
+
+    async def get_or_fetch(
+        self,
+        url: str,
+        fetch: Callable[[], Awaitable[List[Listing]]],
+        fresh: bool = False,
+        scope: str = "",
+    ) -> Tuple[List[Listing], bool]:
+        """(결과, 캐시 적중 여부). fresh=True면 캐시를 건너뛰고 새로 받아서 덮어쓴다."""
+        if not fresh:
+            cached = self.get(url, scope)
+            if cached is not None:
+                return cached, True
+        listings = await fetch()
+        self.put(url, listings, scope)
+        return listings, False
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = f"{self.hits / total:.0%}" if total else "-"
+        return f"entries={len(self._mem)} hit={self.hits} miss={self.misses} ({rate})"
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
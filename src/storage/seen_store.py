@@ -1,26 +1,138 @@
 ﻿from __future__ import annotations
 import json
+import sqlite3
+import time
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.utils.listing_id import migrate_id
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    id         TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seen_last_seen ON seen(last_seen);
+"""
+
+# 1: 예전 id(뭉개진 전체 URL) → utils.listing_id 해시 id
+SCHEMA_VERSION = 1
+
 
 class SeenStore:
-    def __init__(self, path: str):
+    """
+    이미 알림 보낸 숙소 id 저장소 (SQLite).
+    - id별 first_seen / last_seen 기록, 멤버십 확인/추가는 인덱스 조회 1회
+    - WAL + busy_timeout으로 run_once와 텔레그램 봇이 동시에 열어도 안전
+    - ttl_days가 있으면 last_seen이 그보다 오래된 id는 열 때 정리
+    - 같은 이름의 예전 .json 파일이 있으면 처음 열 때 한 번 옮겨 담는다
+    - provider를 주면 예전 URL 기반 id를 숙소 키 해시 id로 한 번 옮긴다
+    """
+
+    def __init__(self, path: str, ttl_days: Optional[float] = None, provider: Optional[str] = None):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_days = ttl_days
+        self.provider = provider
 
-    def load(self) -> set[str]:
-        if not self.path.exists():
-            return set()
+        # autocommit (isolation_level=None): 한 건씩 바로 기록
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(_SCHEMA)
+
+        self._migrate_json(self.path.with_suffix(".json"))
+        if provider:
+            self._migrate_ids()
+        if ttl_days:
+            self.evict()
+
+    def _migrate_json(self, legacy: Path) -> None:
+        if not legacy.exists():
+            return
 
         # 윈도우에서 저장된 UTF-8 BOM(서명)이 있어도 읽히도록 utf-8-sig 사용
-        text = self.path.read_text(encoding="utf-8-sig").strip()
-        if not text:
-            return set()
+        text = legacy.read_text(encoding="utf-8-sig").strip()
+        ids = json.loads(text) if text else []
+        ts = legacy.stat().st_mtime
+        self.add_many(ids, now=ts)
+        legacy.rename(legacy.with_suffix(".json.migrated"))
+
+    def _migrate_ids(self) -> None:
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
 
-        return set(json.loads(text))
+        old_ids = []
+        merged: Dict[str, Tuple[float, float]] = {}
+        for id, first_seen, last_seen in self._conn.execute("SELECT id, first_seen, last_seen FROM seen"):
+            prefix, _, old = id.rpartition(":")  # 봇 감시는 "chat_id:숙소id"
+            new = migrate_id(self.provider, old)
+            if new is None:
+                continue  # 이미 새 형식이거나 숙소 키를 못 찾은 id → 그대로 두고 TTL로 정리
+            new = f"{prefix}:{new}" if prefix else new
+            old_ids.append((id,))
+            # 같은 숙소가 여러 id로 쌓여 있었으면 하나로 합침
+            f, l = merged.get(new, (first_seen, last_seen))
+            merged[new] = (min(f, first_seen), max(l, last_seen))
 
-    def save(self, seen: set[str]) -> None:
-        # 저장은 BOM 없는 UTF-8로 저장 (ensure_ascii=False는 한글 안전)
-        self.path.write_text(
-            json.dumps(sorted(seen), ensure_ascii=False, indent=2),
-            encoding="utf-8",
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM seen WHERE id = ?", old_ids)
+            self._conn.executemany(
+                "INSERT INTO seen (id, first_seen, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen)",
+                ((k, f, l) for k, (f, l) in merged.items()),
+            )
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if old_ids:
+            self._conn.execute("VACUUM")
+
+    def __contains__(self, id: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM seen WHERE id = ?", (id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def add(self, id: str, now: Optional[float] = None) -> bool:
+        """새 id면 True. 이미 있으면 last_seen만 갱신하고 False."""
+        now = time.time() if now is None else now
+        cur = self._conn.execute(
+            "INSERT OR IGNORE INTO seen (id, first_seen, last_seen) VALUES (?, ?, ?)",
+            (id, now, now),
         )
+        if cur.rowcount:
+            return True
+        self.touch(id, now=now)
+        return False
+
+    def add_many(self, ids: Iterable[str], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (id, first_seen, last_seen) VALUES (?, ?, ?)",
+                ((i, now, now) for i in ids),
+            )
+
+    def touch(self, id: str, now: Optional[float] = None) -> bool:
+        """있는 id면 last_seen 갱신 후 True"""
+        now = time.time() if now is None else now
+        cur = self._conn.execute("UPDATE seen SET last_seen = ? WHERE id = ?", (now, id))
+        return cur.rowcount > 0
+
+    def evict(self, ttl_days: Optional[float] = None) -> int:
+        """last_seen이 ttl_days보다 오래된 id 삭제, 삭제 건수 반환"""
+        ttl = self.ttl_days if ttl_days is None else ttl_days
+        if not ttl:
+            return 0
+        cutoff = time.time() - ttl * 86400
+        return self._conn.execute("DELETE FROM seen WHERE last_seen < ?", (cutoff,)).rowcount
+
+    def load(self) -> set[str]:
+        return {r[0] for r in self._conn.execute("SELECT id FROM seen")}
+
+    def close(self) -> None:
+        self._conn.close()
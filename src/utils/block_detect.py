@@ -0,0 +1,62 @@
+from __future__ import annotations
+from typing import Optional
+
+from playwright.async_api import Page, Response
+
+from src.providers.base import BlockedError
+from src.utils.metrics import METRICS
+
+# 차단/캡차 페이지 표시 (소문자, 앞쪽 우선). "bot"/"verify"처럼 정상 페이지에도 흔한 단어는 뺐다
+BLOCK_MARKERS = (
+    "g-recaptcha",
+    "hcaptcha",
+    "px-captcha",
+    "captcha",
+    "challenge-platform",
+    "cf-chl",
+    "awswaf",
+    "are you a robot",
+    "verify you are human",
+    "unusual traffic",
+    "access denied",
+    "request blocked",
+)
+
+BLOCK_STATUS = {403: "http_403", 429: "http_429"}
+
+# 캡차 페이지는 작고 표시가 앞쪽에 있음 → 앞부분만 검사
+_SCAN_CHARS = 60000
+
+# 정상 검색 결과 페이지는 이보다 훨씬 큼. goto 직후 검사는 이보다 작은 페이지만 본다
+# (정상 페이지에 들어 있는 로그인용 reCAPTCHA 스크립트 때문에 오탐하지 않게)
+EARLY_MAX_CHARS = 50000
+
+
+def classify_block(html: str, status: Optional[int] = None, early: bool = False) -> Optional[str]:
+    """
+    차단/캡차 페이지면 이유, 아니면 None.
+    early=True: 카드가 뜨기 전이라 확실한 경우만 (403/429 또는 작은 페이지에 표시)
+    """
+    if status in BLOCK_STATUS:
+        return BLOCK_STATUS[status]
+    if early and len(html) > EARLY_MAX_CHARS:
+        return None
+    low = html[:_SCAN_CHARS].lower()
+    return next((k for k in BLOCK_MARKERS if k in low), None)
+
+
+async def check_page(provider: str, page: Page, response: Optional[Response] = None, early: bool = False) -> None:
+    """
+    차단/캡차면 BlockedError.
+    - goto 직후(early=True): networkidle/카드 대기에 시간 쓰기 전에 끊는다
+    - 카드를 못 찾았을 때(early=False): 표시만 있으면 차단으로 본다
+    """
+    status = response.status if response is not None else None
+    try:
+        html = await page.content()
+    except Exception:
+        html = ""
+    reason = classify_block(html, status, early=early)
+    if reason:
+        METRICS.inc("blocked_pages_total", provider=provider, path="browser")
+        raise BlockedError(provider, reason)
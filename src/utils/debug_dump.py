@@ -1,13 +1,147 @@
 from __future__ import annotations
+import asyncio
+import gzip
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
-from playwright.async_api import Page
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional, Set
+
+from src.utils.logging import log
+from src.utils.metrics import METRICS, span
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # stay-watcher/
+DUMP_DIR = ROOT_DIR / "data" / "debug"
+
+
+@dataclass(frozen=True)
+class DumpCfg:
+    """
+    settings.yaml의 debug_dump 섹션
+    - mode: html (HTML만) | jpeg (뷰포트 JPEG + HTML) | full (전체 페이지 PNG + HTML, 무한 스크롤이면 느리고 큼)
+    - sample: 0~1, 이 비율만 저장 / per_tag_per_hour: 같은 태그는 시간당 이만큼까지
+    - max_mb / max_age_days: data/debug 전체 크기·나이 상한 (넘으면 오래된 것부터 삭제)
+    """
+    enabled: bool = True
+    mode: str = "html"
+    sample: float = 1.0
+    per_tag_per_hour: int = 6
+    jpeg_quality: int = 60
+    gzip: bool = True
+    max_mb: float = 200
+    max_age_days: float = 7
+
+    @classmethod
+    def from_cfg(cls, cfg: Optional[Dict[str, Any]]) -> "DumpCfg":
+        cfg = cfg or {}
+        d = cls()
+        return cls(
+            enabled=bool(cfg.get("enabled", d.enabled)),
+            mode=str(cfg.get("mode", d.mode)),
+            sample=float(cfg.get("sample", d.sample)),
+            per_tag_per_hour=int(cfg.get("per_tag_per_hour", d.per_tag_per_hour)),
+            jpeg_quality=int(cfg.get("jpeg_quality", d.jpeg_quality)),
+            gzip=bool(cfg.get("gzip", d.gzip)),
+            max_mb=float(cfg.get("max_mb", d.max_mb)),
+            max_age_days=float(cfg.get("max_age_days", d.max_age_days)),
+        )
+
+
+_cfg = DumpCfg()
+_recent: Dict[str, Deque[float]] = {}   # 태그 → 최근 1시간 저장 시각
+_pending: Set[asyncio.Task] = set()      # 백그라운드 쓰기 (flush에서 기다림)
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> None:
+    global _cfg
+    _cfg = DumpCfg.from_cfg(cfg)
+
+
+def _allow(tag: str, now: float) -> bool:
+    if not _cfg.enabled or random.random() >= _cfg.sample:
+        return False
+    q = _recent.setdefault(tag, deque())
+    while q and now - q[0] > 3600:
+        q.popleft()
+    if len(q) >= _cfg.per_tag_per_hour:
+        return False
+    q.append(now)
+    return True
+
+
+def _write(base: Path, html: str, image: Optional[bytes], image_ext: str, cfg: DumpCfg) -> None:
+    data = html.encode("utf-8")
+    if cfg.gzip:
+        (base.parent / f"{base.name}.html.gz").write_bytes(gzip.compress(data, compresslevel=6))
+    else:
+        (base.parent / f"{base.name}.html").write_bytes(data)
+    if image is not None:
+        # 이미지는 이미 압축돼 있어서 gzip 안 함
+        (base.parent / f"{base.name}.{image_ext}").write_bytes(image)
+    prune(base.parent, int(cfg.max_mb * 1024 * 1024), cfg.max_age_days * 86400)
+
+
+def prune(d: Path, max_bytes: int, max_age: float) -> int:
+    """링 버퍼처럼: 오래된 파일부터 지워서 나이/전체 크기 상한을 맞춘다. 지운 파일 수"""
+    now = time.time()
+    files = []
+    for p in d.iterdir():
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        if p.is_file():
+            files.append((st.st_mtime, st.st_size, p))
+    files.sort()
+
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, p in files:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
 
 async def dump_page(page: Page, tag: str) -> None:
-    root = Path(__file__).resolve().parents[2]  # stay-watcher/
-    d = root / "data" / "debug"
-    d.mkdir(parents=True, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    await page.screenshot(path=str(d / f"{tag}_{ts}.png"), full_page=True)
-    html = await page.content()
-    (d / f"{tag}_{ts}.html").write_text(html, encoding="utf-8")
+    """
+    카드 0건/selector 없음일 때 페이지 저장 (샘플링 + 태그별 시간당 상한).
+    페이지에서 뽑아내는 것만 기다리고, 압축/파일 쓰기/정리는 백그라운드에서.
+    """
+    if not _allow(tag, time.time()):
+        METRICS.inc("debug_dumps_skipped_total", tag=tag)
+        return
+
+    cfg = _cfg
+    image, image_ext = None, "jpg"
+    try:
+        with span("debug", "capture"):
+            html = await page.content()
+            if cfg.mode == "jpeg":
+                image = await page.screenshot(type="jpeg", quality=cfg.jpeg_quality, full_page=False)
+            elif cfg.mode == "full":
+                image, image_ext = await page.screenshot(full_page=True), "png"
+    except Exception as e:
+        # 덤프 실패로 fetch까지 실패시키지 않음
+        log(f"[debug] dump failed {tag}: {type(e).__name__}: {e}")
+        return
+
+    DUMP_DIR.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")  # 같은 초에 여러 번 덤프해도 안 덮어쓰게
+    METRICS.inc("debug_dumps_total", tag=tag)
+    t = asyncio.create_task(asyncio.to_thread(_write, DUMP_DIR / f"{tag}_{ts}", html, image, image_ext, cfg))
+    _pending.add(t)
+    t.add_done_callback(_pending.discard)
+
+
+async def flush() -> None:
+    """종료 전에 남은 덤프 쓰기를 마저 끝낸다"""
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from playwright.async_api import Page
+
+# (selector, attribute)
+# - selector가 ""이면 카드 요소 자신
+# - attribute가 None이면 innerText
+Field = Tuple[str, Optional[str]]
+Row = Dict[str, Optional[str]]
+
+_EXTRACT_JS = """
+({card, fields, limit}) => {
+  const nodes = Array.from(document.querySelectorAll(card)).slice(0, limit);
+  return nodes.map((n) => {
+    const row = {};
+    for (const [key, [sel, attr]] of Object.entries(fields)) {
+      const el = sel ? n.querySelector(sel) : n;
+      if (!el) { row[key] = null; continue; }
+      row[key] = attr ? el.getAttribute(attr) : el.innerText;
+    }
+    return row;
+  });
+}
+"""
+
+
+async def extract_cards(page: Page, card: str, fields: Dict[str, Field], limit: int = 25) -> List[Row]:
+    """
+    카드 selector + 필드 스펙을 페이지 안에서 한 번의 evaluate로 추출한다.
+    카드 수와 상관없이 CDP 왕복은 1회.
+    """
+    spec = {k: [sel, attr] for k, (sel, attr) in fields.items()}
+    return await page.evaluate(_EXTRACT_JS, {"card": card, "fields": spec, "limit": limit})
+
+
+def _text(el) -> str:
+    # innerText와 비슷하게: 블록 사이 줄바꿈, 앞뒤 공백 제거
+    return el.get_text("\n", strip=True)
+
+
+def extract_cards_html(
+    html: str,
+    candidates: List[str],
+    fields: Dict[str, Field],
+    limit: int = 25,
+) -> Tuple[Optional[str], List[Row]]:
+    """
+    extract_cards의 브라우저 없는 버전 (BeautifulSoup + lxml).
+    후보 selector 중 카드가 있는 첫 번째로 추출 → (selector, rows).
+    저장된 HTML 벤치마크 / 서버 렌더링 페이지 직접 파싱용.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    for card in candidates:
+        nodes = soup.select(card, limit=limit)
+        if not nodes:
+            continue
+        rows: List[Row] = []
+        for n in nodes:
+            row: Row = {}
+            for key, (sel, attr) in fields.items():
+                el = n.select_one(sel) if sel else n
+                if el is None:
+                    row[key] = None
+                elif attr:
+                    v = el.get(attr)
+                    row[key] = " ".join(v) if isinstance(v, list) else v
+                else:
+                    row[key] = _text(el)
+            rows.append(row)
+        return card, rows
+    return None, []
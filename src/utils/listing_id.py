@@ -0,0 +1,105 @@
+"""
+숙소 URL → 세션/날짜/추적 파라미터와 무관한 고정 길이 id.
+
+1) 공급자별로 숙소를 가리키는 부분(slug 또는 숫자 id)만 뽑는다 (canonical_key)
+2) 그 키를 해시해서 16자 hex로 만든다 (listing_id)
+
+키 추출은 영숫자 외 문자를 "_"로 바꾼 문자열 위에서 한다.
+예전 id(re.sub(r"[^a-zA-Z0-9]+", "_", url)[:120])도 같은 형태라서
+SeenStore가 기존 기록을 새 id로 옮길 수 있다.
+
+언어 접미사(.ko.html)는 URL 경로에서 먼저 지운다. 뭉개진 문자열에선
+"-ii.html"과 ".ko.html"을 구분할 수 없어서, 그 손실 있는 패턴(_LEGACY)은
+예전 id를 옮길 때(migrate_id)만 쓴다.
+"""
+from __future__ import annotations
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+ID_LEN = 16
+_HASH_ID = re.compile(r"[0-9a-f]{16}")
+
+# 언어 접미사: .ko.html / .en-gb.html (원래 URL 경로 기준)
+_LANG_SUFFIX = re.compile(r"\.[a-z]{2}(?:-[a-z]{2})?\.html$", re.I)
+
+_BOOKING_ID = re.compile(r"(?:^|_)(?:hotel_id|highlighted_hotels)_(\d+)")
+
+_PATTERNS = {
+    "booking": [
+        # /hotel/kr/lotte-seoul.html (언어 접미사는 _strip_lang에서 이미 지움)
+        re.compile(r"booking_com_hotel_([a-z]{2}_[a-z0-9_]+?)_html"),
+        _BOOKING_ID,
+    ],
+    "agoda": [
+        # /ko-kr/lotte-hotel-seoul/hotel/seoul-kr.html
+        re.compile(r"agoda_com_(?:[a-z]{2}_[a-z]{2}_)?([a-z0-9_]+?_hotel_[a-z0-9_]+?)_html"),
+        # /hotel/123.html (API 폴백 링크), ?hotel_id=123, ?selectedproperty=123
+        re.compile(r"agoda_com_(?:[a-z]{2}_[a-z]{2}_)?hotel_(\d+)_html"),
+        re.compile(r"(?:^|_)(?:hotel_?id|selectedproperty)_(\d+)"),
+    ],
+    "trip": [
+        # ?hotelId=123, /hotels/<name>-hotel-detail-123/
+        re.compile(r"(?:^|_)hotelid_(\d+)"),
+        re.compile(r"hotel_detail_(\d+)"),
+    ],
+}
+
+
+# 예전 id 전용: 이미 뭉개져서 언어 접미사를 "_xx_html"로만 알아볼 수 있음
+# (slug 끝의 두 글자 토큰도 같이 지워지는 손실 있는 패턴)
+_LEGACY = {
+    "booking": [
+        re.compile(r"booking_com_hotel_([a-z]{2}_[a-z0-9_]+?)(?:_[a-z]{2}(?:_[a-z]{2})?)?_html"),
+        _BOOKING_ID,
+    ],
+}
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9]+", "_", text).lower()
+
+
+def _strip_lang(url: str) -> str:
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=_LANG_SUFFIX.sub(".html", parts.path)))
+
+
+def canonical_key(provider: str, text: str, legacy: bool = False) -> Optional[str]:
+    """URL(legacy면 예전 방식으로 뭉개진 id)에서 숙소 키 추출. 못 찾으면 None"""
+    if legacy:
+        norm, patterns = _norm(text), _LEGACY.get(provider) or _PATTERNS.get(provider, [])
+    else:
+        norm, patterns = _norm(_strip_lang(text)), _PATTERNS.get(provider, [])
+    for pat in patterns:
+        m = pat.search(norm)
+        if m:
+            return m.group(1)
+    return None
+
+
+def _hash(provider: str, key: str) -> str:
+    return hashlib.blake2b(f"{provider}:{key}".encode(), digest_size=ID_LEN // 2).hexdigest()
+
+
+def listing_id(provider: str, url: str) -> str:
+    """숙소 상세 URL → id. 검색 결과 URL을 넘기면 어느 숙소든 같은 id가 되므로 공급자 쪽에서 걸러야 함"""
+    key = canonical_key(provider, url)
+    if key is None:
+        # 모르는 형태: 쿼리/프래그먼트만 빼고 경로 기준
+        parts = urlsplit(url)
+        key = _norm(parts.netloc + parts.path)
+    return _hash(provider, key)
+
+
+def is_listing_id(id: str) -> bool:
+    return _HASH_ID.fullmatch(id) is not None
+
+
+def migrate_id(provider: str, old: str) -> Optional[str]:
+    """예전 id → 새 id. 이미 새 형식이거나 숙소 키를 못 찾으면 None"""
+    if is_listing_id(old):
+        return None
+    key = canonical_key(provider, old, legacy=True)
+    return None if key is None else _hash(provider, key)
@@ -1,13 +1,197 @@
 ﻿from __future__ import annotations
+import atexit
+import json
+import queue
+import threading
 import time
 from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
 
 LOG_PATH = Path("logs/bot.log")
 
-def log(msg: str) -> None:
-    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    with LOG_PATH.open("a", encoding="utf-8") as f:
-        f.write(line + "\n")
+
+class _Writer(threading.Thread):
+    """
+    로그 큐를 비우는 백그라운드 스레드.
+    - 줄을 모아서(batch) 한 번에 쓰고 flush → 이벤트 루프는 파일 I/O를 안 기다림
+    - 크기(max_bytes) 또는 날짜(rotate="daily")로 교체, backups개까지만 보관
+    - fmt="json"이면 한 줄에 JSON 하나 (ts, msg, 추가 필드)
+    """
+
+    def __init__(
+        self,
+        path: Path = LOG_PATH,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+        rotate: str = "size",
+        fmt: str = "text",
+        console: bool = True,
+        batch: int = 200,
+        flush_sec: float = 0.5,
+        prev: Optional["_Writer"] = None,
+    ):
+        super().__init__(name="log-writer", daemon=True)
+        self.prev = prev  # 재설정 전 writer: 그게 큐를 다 비우고 끝난 뒤에 쓰기 시작 (줄 순서 유지)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotate = rotate
+        self.fmt = fmt
+        self.console = console
+        self.batch = batch
+        self.flush_sec = flush_sec
+        self.q: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        self._f: Optional[TextIO] = None
+        self._day = ""
+        self.dropped = 0
+
+    # ---- 파일 ----
+    def _open(self) -> TextIO:
+        if self._f is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # 이전 날에 쓰던 파일이 남아 있으면 그 날짜 기준 → daily면 첫 쓰기에서 바로 교체
+            try:
+                st = self.path.stat()
+                ts = st.st_mtime if st.st_size else time.time()
+            except FileNotFoundError:
+                ts = time.time()
+            self._f = self.path.open("a", encoding="utf-8")
+            self._day = time.strftime("%Y-%m-%d", time.localtime(ts))
+        return self._f
+
+    def _should_rotate(self) -> bool:
+        if self.rotate == "daily":
+            return time.strftime("%Y-%m-%d") != self._day
+        return self.max_bytes > 0 and self._f is not None and self._f.tell() >= self.max_bytes
+
+    def _do_rotate(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if self.path.exists():
+            suffix = self._day if self.rotate == "daily" else time.strftime("%Y%m%d-%H%M%S")
+            target = self.path.with_name(f"{self.path.name}.{suffix}")
+            n = 1
+            while target.exists():
+                target = self.path.with_name(f"{self.path.name}.{suffix}.{n}")
+                n += 1
+            self.path.rename(target)
+        # 보관 개수 초과분은 오래된 것부터 삭제
+        old = sorted(self.path.parent.glob(self.path.name + ".*"), key=lambda p: p.stat().st_mtime)
+        for p in old[: max(0, len(old) - self.backups)]:
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    def _format(self, ts: float, msg: str, fields: Dict[str, Any]) -> str:
+        if self.fmt == "json":
+            rec = {"ts": round(ts, 3), "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)), "msg": msg}
+            rec.update(fields)
+            return json.dumps(rec, ensure_ascii=False, default=str)
+        return f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}] {msg}"
+
+    def _write(self, items: List[tuple]) -> None:
+        text_lines = []
+        for ts, msg, fields in items:
+            if self.console:
+                print(f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}] {msg}")
+            text_lines.append(self._format(ts, msg, fields))
+        try:
+            f = self._open()
+            if self._should_rotate():
+                self._do_rotate()
+                f = self._open()
+            f.write("\n".join(text_lines) + "\n")
+            f.flush()
+        except OSError:
+            self.dropped += len(items)
+
+    # ---- 루프 ----
+    def run(self) -> None:
+        if self.prev is not None:
+            self.prev.join(timeout=10)
+            self.prev = None
+        while True:
+            item = self.q.get()
+            items = []
+            stop = item is None
+            if not stop:
+                items.append(item)
+            # 짧게 더 모아서 한 번에 쓰기
+            deadline = time.monotonic() + self.flush_sec
+            while not stop and len(items) < self.batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    items.append(item)
+            if items:
+                self._write(items)
+            if stop:
+                if self._f is not None:
+                    self._f.close()
+                    self._f = None
+                return
+
+
+_writer: Optional[_Writer] = None
+_lock = threading.Lock()
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> None:
+    """
+    settings.yaml의 logging 섹션으로 설정 (run_once/봇 시작 시).
+    호출 전에 쌓인 로그는 기존 writer가 마저 쓰고, 새 writer는 그게 끝날 때까지 새 로그를 모아만 둔다
+    (같은 파일에 두 스레드가 동시에 안 씀). 기다리는 건 새 writer 스레드라서 이벤트 루프 안에서 불러도 안 막힘.
+    """
+    global _writer
+    cfg = cfg or {}
+    kwargs = dict(
+        path=Path(cfg.get("path", str(LOG_PATH))),
+        max_bytes=int(float(cfg.get("max_mb", 10)) * 1024 * 1024),
+        backups=int(cfg.get("backups", 5)),
+        rotate=str(cfg.get("rotate", "size")),
+        fmt=str(cfg.get("format", "text")),
+        console=bool(cfg.get("console", True)),
+    )
+    with _lock:
+        old = _writer
+        if old is not None:
+            old.q.put(None)  # 이 뒤의 로그는 새 큐로
+        _writer = _Writer(prev=old, **kwargs)
+        _writer.start()
+
+
+def _get() -> _Writer:
+    global _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _writer = _Writer()
+                _writer.start()
+    return _writer
+
+
+def log(msg: str, **fields: Any) -> None:
+    """큐에 넣기만 하고 바로 반환 (파일 쓰기는 백그라운드 스레드). fields는 JSON 형식일 때 같이 기록"""
+    _get().q.put((time.time(), msg, fields))
+
+
+def shutdown(timeout: float = 5) -> None:
+    """남은 로그를 모두 쓰고 writer 종료 (프로세스 종료 시 자동 호출)"""
+    global _writer
+    with _lock:
+        w, _writer = _writer, None
+    if w is not None and w.is_alive():
+        w.q.put(None)
+        w.join(timeout=timeout)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,224 @@
+from __future__ import annotations
+import functools
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 단계별 소요 시간 히스토그램 경계 (초)
+BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# 단계가 끝날 때마다 불리는 콜백 (provider, stage, 초). 봇 /run 작업 안에서만 설정 → 진행 상황 표시
+STAGE_HOOK: ContextVar[Optional[Callable[[str, str, float], None]]] = ContextVar("stage_hook", default=None)
+
+
+def _labels(kw: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in kw.items()))
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """버킷 경계 기준 근사 분위수 (그 분위수가 들어간 칸의 상한)"""
+        if not self.count:
+            return 0.0
+        rank, acc = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class Registry:
+    """
+    프로세스 안 메트릭 모음 (카운터 + 히스토그램, 라벨별).
+    - stage_seconds{provider, stage}: 단계별 소요 시간
+    - listings_parsed_total{provider}, blocked_pages_total{provider}, fetch_errors_total{provider} ...
+    Prometheus 텍스트(.prom) 또는 JSON(.json)으로 내보낸다.
+    """
+
+    PREFIX = "stay_"
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        series = self.counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = _labels(labels)
+        h = series.get(key)
+        if h is None:
+            h = series[key] = Histogram()
+        h.observe(value)
+
+    @contextmanager
+    def span(self, provider: str, stage: str) -> Iterator[None]:
+        """with METRICS.span("booking", "goto"): ... → stage_seconds에 기록 (예외여도 기록)"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.observe("stage_seconds", elapsed, provider=provider, stage=stage)
+            hook = STAGE_HOOK.get()
+            if hook is not None:
+                hook(provider, stage, elapsed)
+
+    # ---- 워커 프로세스 → 코디네이터 ----
+    def drain(self) -> Tuple[Dict[str, Dict[Labels, float]], Dict[str, Dict[Labels, Histogram]]]:
+        """지금까지 쌓인 값을 넘겨주고 비운다 (워커가 코디네이터로 증분만 보낼 때)"""
+        out = (self.counters, self.histograms)
+        self.counters, self.histograms = {}, {}
+        return out
+
+    def merge(
+        self,
+        counters: Dict[str, Dict[Labels, float]],
+        histograms: Dict[str, Dict[Labels, Histogram]],
+    ) -> None:
+        for name, series in counters.items():
+            mine = self.counters.setdefault(name, {})
+            for k, v in series.items():
+                mine[k] = mine.get(k, 0) + v
+        for name, hseries in histograms.items():
+            mine_h = self.histograms.setdefault(name, {})
+            for k, h in hseries.items():
+                cur = mine_h.get(k)
+                if cur is None:
+                    mine_h[k] = h
+                    continue
+                cur.counts = [a + b for a, b in zip(cur.counts, h.counts)]
+                cur.count += h.count
+                cur.sum += h.sum
+
+    # ---- 내보내기 ----
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "time": time.time(),
+            "counters": {
+                name: [{"labels": dict(k), "value": v} for k, v in series.items()]
+                for name, series in self.counters.items()
+            },
+            "histograms": {
+                name: [
+                    {
+                        "labels": dict(k),
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.counts)),
+                    }
+                    for k, h in series.items()
+                ]
+                for name, series in self.histograms.items()
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        for name, series in sorted(self.counters.items()):
+            metric = self.PREFIX + name
+            lines.append(f"# TYPE {metric} counter")
+            for k, v in sorted(series.items()):
+                lines.append(f"{metric}{fmt(k)} {v:g}")
+
+        for name, series in sorted(self.histograms.items()):
+            metric = self.PREFIX + name
+            lines.append(f"# TYPE {metric} histogram")
+            for k, h in sorted(series.items()):
+                acc = 0
+                for b, c in zip(list(h.buckets) + [float("inf")], h.counts):
+                    acc += c
+                    le = "+Inf" if b == float("inf") else f"{b:g}"
+                    lines.append(f"{metric}_bucket{fmt(k, (('le', le),))} {acc}")
+                lines.append(f"{metric}_sum{fmt(k)} {h.sum:.6f}")
+                lines.append(f"{metric}_count{fmt(k)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """확장자가 .json이면 JSON 스냅샷, 아니면 Prometheus 텍스트 (node_exporter textfile용)"""
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        text = (
+            json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+            if p.suffix == ".json" else self.to_prometheus()
+        )
+        tmp = p.with_suffix(p.suffix + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, p)
+
+    def summary(self) -> str:
+        """/stats 용 짧은 요약: 공급자별 단계 p50/p95 + 카운터"""
+        lines: List[str] = []
+        stages = self.histograms.get("stage_seconds", {})
+        by_provider: Dict[str, List[Tuple[str, Histogram]]] = {}
+        for k, h in stages.items():
+            d = dict(k)
+            by_provider.setdefault(d.get("provider", "-"), []).append((d.get("stage", "-"), h))
+        for provider in sorted(by_provider):
+            lines.append(f"[{provider}]")
+            for stage, h in sorted(by_provider[provider], key=lambda t: -t[1].sum):
+                lines.append(f"  {stage}: n={h.count} avg={h.sum / h.count:.2f}s "
+                             f"p50≤{h.quantile(0.5):g}s p95≤{h.quantile(0.95):g}s")
+        for name, series in sorted(self.counters.items()):
+            for k, v in sorted(series.items()):
+                label = ",".join(f"{a}={b}" for a, b in k)
+                lines.append(f"{name}{'{' + label + '}' if label else ''} = {v:g}")
+        return "\n".join(lines) if lines else "아직 수집된 지표가 없어요."
+
+
+METRICS = Registry()
+
+
+def span(provider: str, stage: str):
+    return METRICS.span(provider, stage)
+
+
+def timed_fetch(fn):
+    """
+    provider.fetch 데코레이터: 전체 fetch 시간(stage=fetch), 파싱된 숙소 수, 실패 수 기록
+    """
+    @functools.wraps(fn)
+    async def wrapper(self, url: str, *args: Any, **kwargs: Any):
+        try:
+            with METRICS.span(self.name, "fetch"):
+                listings = await fn(self, url, *args, **kwargs)
+        except Exception:
+            METRICS.inc("fetch_errors_total", provider=self.name)
+            raise
+        METRICS.inc("listings_parsed_total", len(listings), provider=self.name)
+        return listings
+
+    return wrapper
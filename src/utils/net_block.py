@@ -0,0 +1,146 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Optional, Pattern, Tuple
+
+if TYPE_CHECKING:  # 타입 표기용 (TOTALS만 쓰는 runner가 Playwright를 import하지 않게)
+    from playwright.async_api import BrowserContext, Request, Response, Route
+
+# 결과(Listing) 추출에 필요 없는 리소스 타입
+DEFAULT_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# 광고/분석 스크립트 (URL에 포함되면 차단)
+DEFAULT_DENY = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "connect.facebook",
+    "hotjar.com",
+    "criteo.",
+    "adservice.",
+    "bat.bing.com",
+    "clarity.ms",
+    "scorecardresearch.com",
+    "/beacon",
+)
+
+# 차단한 요청은 크기를 알 수 없어서 타입별 평균 크기로 추정
+EST_BYTES = {
+    "image": 40_000,
+    "media": 300_000,
+    "font": 30_000,
+    "script": 60_000,
+    "stylesheet": 20_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+EST_BYTES_OTHER = 10_000
+
+
+def _compile(patterns: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    if not patterns:
+        return None
+    return re.compile("|".join(re.escape(p) for p in patterns), re.IGNORECASE)
+
+
+@dataclass
+class BlockStats:
+    blocked: int = 0
+    est_bytes_saved: int = 0
+    loaded: int = 0
+    bytes_loaded: int = 0
+    by_type: Dict[str, int] = field(default_factory=dict)
+
+    def merge(self, other: "BlockStats") -> None:
+        self.blocked += other.blocked
+        self.est_bytes_saved += other.est_bytes_saved
+        self.loaded += other.loaded
+        self.bytes_loaded += other.bytes_loaded
+        for k, v in other.by_type.items():
+            self.by_type[k] = self.by_type.get(k, 0) + v
+
+    def summary(self) -> str:
+        return (
+            f"blocked={self.blocked} (~{self.est_bytes_saved / 1e6:.1f}MB saved) "
+            f"loaded={self.loaded} ({self.bytes_loaded / 1e6:.1f}MB)"
+        )
+
+
+@dataclass(frozen=True)
+class BlockProfile:
+    """
+    공급자별 요청 차단 규칙.
+    - allow 패턴에 걸리면 무조건 통과
+    - resource_types 또는 deny 패턴에 걸리면 abort
+    """
+    name: str = "default"
+    enabled: bool = True
+    resource_types: FrozenSet[str] = DEFAULT_RESOURCE_TYPES
+    deny: Tuple[str, ...] = DEFAULT_DENY
+    allow: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_cfg(cls, name: str, cfg: Optional[Dict[str, Any]]) -> "BlockProfile":
+        """settings.yaml의 <provider>.block 섹션 → BlockProfile (없는 키는 기본값)"""
+        cfg = cfg or {}
+        return cls(
+            name=name,
+            enabled=bool(cfg.get("enabled", True)),
+            resource_types=frozenset(cfg.get("resource_types", DEFAULT_RESOURCE_TYPES)),
+            deny=tuple(cfg.get("deny", DEFAULT_DENY)) + tuple(cfg.get("extra_deny", ())),
+            allow=tuple(cfg.get("allow", ())),
+        )
+
+
+# 공급자별 누적 통계 (프로세스 단위)
+TOTALS: Dict[str, BlockStats] = {}
+
+
+class RequestBlocker:
+    """context 하나에 붙는 요청 가로채기. stats는 context 단위로 집계."""
+
+    def __init__(self, profile: BlockProfile):
+        self.profile = profile
+        self.stats = BlockStats()
+        self._deny = _compile(profile.deny)
+        self._allow = _compile(profile.allow)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if self._allow is not None and self._allow.search(url):
+            return False
+        if resource_type in self.profile.resource_types:
+            return True
+        return self._deny is not None and self._deny.search(url) is not None
+
+    async def _on_route(self, route: Route, request: Request) -> None:
+        rtype = request.resource_type
+        if self.should_block(request.url, rtype):
+            self.stats.blocked += 1
+            self.stats.est_bytes_saved += EST_BYTES.get(rtype, EST_BYTES_OTHER)
+            self.stats.by_type[rtype] = self.stats.by_type.get(rtype, 0) + 1
+            try:
+                await route.abort()
+            except Exception:
+                pass
+            return
+        try:
+            await route.continue_()
+        except Exception:
+            pass
+
+    def _on_response(self, response: Response) -> None:
+        self.stats.loaded += 1
+        try:
+            self.stats.bytes_loaded += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    async def install(self, context: BrowserContext) -> None:
+        await context.route("**/*", self._on_route)
+        context.on("response", self._on_response)
+
+    def finish(self) -> BlockStats:
+        TOTALS.setdefault(self.profile.name, BlockStats()).merge(self.stats)
+        return self.stats
@@ -1,6 +1,7 @@
 
 from __future__ import annotations
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 from playwright.async_api import Page
 
 async def wait_and_pick_selector(page: Page, selectors: List[str], timeout_ms: int = 20000) -> Optional[str]:
@@ -12,7 +13,107 @@ async def wait_and_pick_selector(page: Page, selectors: List[str], timeout_ms: i
             continue
     return None
 
-async def scroll_a_bit(page: Page, times: int = 4, dy: int = 2500, pause_ms: int = 700) -> None:
-    for _ in range(times):
-        await page.mouse.wheel(0, dy)
-        await page.wait_for_timeout(pause_ms)
+
+@dataclass(frozen=True)
+class StableWait:
+    """
+    카드 목록 안정화 대기 설정 (settings.yaml의 <provider>.wait 섹션)
+    - target_cards: 이만큼 카드가 보이면 즉시 반환
+    - quiet_ms: 카드 수가 이 시간 동안 안 늘면 반환
+    - max_wait_ms: 최대 대기 시간
+    - scroll_step: 카드 수가 멈춰 있을 때 lazy-load 유도용 스크롤 (0이면 스크롤 안 함)
+    """
+    target_cards: int = 25
+    quiet_ms: int = 1200
+    max_wait_ms: int = 15000
+    scroll_step: int = 2500
+
+    @classmethod
+    def from_cfg(cls, cfg: Optional[Dict[str, Any]], **defaults: Any) -> "StableWait":
+        base = cls(**defaults)
+        cfg = cfg or {}
+        return cls(
+            target_cards=int(cfg.get("target_cards", base.target_cards)),
+            quiet_ms=int(cfg.get("quiet_ms", base.quiet_ms)),
+            max_wait_ms=int(cfg.get("max_wait_ms", base.max_wait_ms)),
+            scroll_step=int(cfg.get("scroll_step", base.scroll_step)),
+        )
+
+
+@dataclass
+class StableResult:
+    selector: Optional[str]   # 카드가 잡힌 첫 후보 selector (없으면 None)
+    count: int
+    reason: str               # target | quiet | timeout | error
+    elapsed_ms: int
+
+
+_STABLE_JS = """
+({selectors, target, quietMs, maxMs, scrollStep}) => new Promise((resolve) => {
+  const t0 = performance.now();
+  let last = -1, lastChange = t0, pending = false, done = false;
+  let obs = null, timer = null;
+
+  // 후보 순서대로: 카드가 하나라도 있는 첫 selector
+  const pick = () => {
+    for (const s of selectors) {
+      const n = document.querySelectorAll(s).length;
+      if (n > 0) return [s, n];
+    }
+    return [null, 0];
+  };
+
+  const finish = (reason) => {
+    if (done) return;
+    done = true;
+    if (obs) obs.disconnect();
+    clearInterval(timer);
+    const [sel, n] = pick();
+    resolve({selector: sel, count: n, reason, elapsed: Math.round(performance.now() - t0)});
+  };
+
+  const check = () => {
+    pending = false;
+    const now = performance.now();
+    const [, n] = pick();
+    if (n !== last) { last = n; lastChange = now; }
+    if (n >= target) return finish("target");
+    if (n > 0 && now - lastChange >= quietMs) return finish("quiet");
+    if (now - t0 >= maxMs) return finish("timeout");
+  };
+
+  // DOM 변경이 몰려도 50ms에 한 번만 카드 수를 센다
+  obs = new MutationObserver(() => {
+    if (!pending) { pending = true; setTimeout(check, 50); }
+  });
+  obs.observe(document.documentElement, {childList: true, subtree: true});
+
+  const tick = Math.max(100, Math.min(300, Math.floor(quietMs / 4)));
+  timer = setInterval(() => {
+    // 카드 수가 멈춰 있으면 스크롤로 추가 로드 유도
+    if (scrollStep > 0 && performance.now() - lastChange >= tick) window.scrollBy(0, scrollStep);
+    check();
+  }, tick);
+  check();
+})
+"""
+
+
+async def wait_until_stable(page: Page, selectors: List[str], opts: StableWait = StableWait()) -> StableResult:
+    """
+    MutationObserver로 카드 수를 추적하다가
+    target_cards개가 보이거나, quiet_ms 동안 더 안 늘거나, max_wait_ms가 지나면 반환한다.
+    (고정 sleep 루프 대체 — 카드가 이미 다 떠 있으면 바로 끝남)
+    """
+    try:
+        r = await page.evaluate(_STABLE_JS, {
+            "selectors": list(selectors),
+            "target": opts.target_cards,
+            "quietMs": opts.quiet_ms,
+            "maxMs": opts.max_wait_ms,
+            "scrollStep": opts.scroll_step,
+        })
+    except Exception:
+        # 대기 중 네비게이션 등으로 컨텍스트가 깨진 경우
+        return StableResult(selector=None, count=0, reason="error", elapsed_ms=0)
+    return StableResult(selector=r["selector"], count=r["count"], reason=r["reason"], elapsed_ms=r["elapsed"])
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.providers.base import Listing
+from src.utils.logging import log
+
+# 조건(Rules) 통과 여부 — 조건에 맞는 숙소가 안 나오면 다음 페이지를 그만 받는다
+Accept = Callable[[Listing], bool]
+
+
+@dataclass(frozen=True)
+class PageOpts:
+    """
+    결과 페이지 순회 설정 (settings.yaml의 <provider>.pages 섹션)
+    - max_pages: 첫 페이지 포함 최대 페이지 수 (1이면 예전처럼 첫 페이지만)
+    - max_listings: 모든 페이지 합쳐 최대 숙소 수
+    - parallel: 한 번에 여는 탭 수 (같은 context 안에서)
+    - stop_after: 조건 맞는 새 숙소가 없는 페이지가 연속 이만큼이면 중단
+    """
+    max_pages: int = 1
+    max_listings: int = 200
+    parallel: int = 3
+    stop_after: int = 2
+
+    @classmethod
+    def from_cfg(cls, cfg: Optional[Dict[str, Any]]) -> "PageOpts":
+        base = cls()
+        cfg = cfg or {}
+        return cls(
+            max_pages=max(1, int(cfg.get("max_pages", base.max_pages))),
+            max_listings=max(1, int(cfg.get("max_listings", base.max_listings))),
+            parallel=max(1, int(cfg.get("parallel", base.parallel))),
+            stop_after=max(1, int(cfg.get("stop_after", base.stop_after))),
+        )
+
+
+def accept_scope(provider: Any, signature: str) -> str:
+    """
+    결과 캐시/합류 키에 붙일 조건 서명.
+    여러 페이지(묶음)를 받는 공급자는 accept에 따라 일찍 멈추므로 같은 URL이라도 조건이 다르면 결과가 다름 → signature.
+    첫 페이지만 받으면 조건과 무관 → "" (URL만으로 공유). pages를 모르는 공급자(워커 대리 등)는 나눠 둔다.
+    """
+    pages = getattr(provider, "pages", None)
+    return "" if isinstance(pages, PageOpts) and pages.max_pages <= 1 else signature
+
+
+def with_param(url: str, key: str, value: Any) -> str:
+    """url의 쿼리 파라미터 key를 value로 바꾸거나 추가"""
+    parts = urlsplit(url)
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != key]
+    params.append((key, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+async def crawl_pages(
+    name: str,
+    first: List[Listing],
+    page_url: Callable[[int], Optional[str]],
+    fetch_page: Callable[[str], Awaitable[List[Listing]]],
+    opts: PageOpts,
+    accept: Optional[Accept] = None,
+) -> List[Listing]:
+    """
+    첫 페이지 결과 + 2페이지부터 parallel개씩 동시에 받아서 합친다.
+    - page_url(i): i번째 추가 페이지(1부터) URL, 없으면 None
+    - 페이지 간 같은 숙소(id)는 한 번만
+    - 새 숙소가 없는 페이지(결과 끝) / max_listings / stop_after에서 중단
+    """
+    out: List[Listing] = []
+    ids: Set[str] = set()
+
+    def merge(listings: List[Listing]) -> Tuple[int, int]:
+        new = hit = 0
+        for x in listings:
+            if x.id in ids or len(out) >= opts.max_listings:
+                continue
+            ids.add(x.id)
+            out.append(x)
+            new += 1
+            if accept is None or accept(x):
+                hit += 1
+        return new, hit
+
+    new, hit = merge(first)
+    dry = 0 if hit else 1
+    i = done = 1
+    while i < opts.max_pages and new and dry < opts.stop_after and len(out) < opts.max_listings:
+        urls = [u for u in (page_url(k) for k in range(i, min(i + opts.parallel, opts.max_pages))) if u]
+        if not urls:
+            break
+        pages = await asyncio.gather(*(fetch_page(u) for u in urls), return_exceptions=True)
+        i += len(urls)
+
+        # 페이지 순서대로 합치면서 중단 조건 확인 (뒤 페이지는 버림)
+        for res in pages:
+            if isinstance(res, BaseException):
+                log(f"[{name}] page {done + 1} failed: {type(res).__name__}: {res}")
+                new = 0
+                break
+            done += 1
+            new, hit = merge(res)
+            dry = 0 if hit else dry + 1
+            if not new or dry >= opts.stop_after or len(out) >= opts.max_listings:
+                break
+
+    if opts.max_pages > 1:
+        log(f"[{name}] pages={done} listings={len(out)}")
+    return out
+
+
+async def scroll_pages(
+    name: str,
+    first: List[Listing],
+    load_more: Callable[[int], Awaitable[List[Listing]]],
+    opts: PageOpts,
+    accept: Optional[Accept] = None,
+) -> List[Listing]:
+    """
+    무한 스크롤 목록용 crawl_pages: 같은 탭에서 한 묶음씩 더 불러온다 (순서대로, 동시 실행 없음).
+    - load_more(i): i번째 추가 묶음(1부터). 이미 받은 숙소가 섞여 있어도 됨 (id로 중복 제거)
+    - max_pages=1이어도 중복 제거/max_listings는 적용
+    """
+    # 탭 하나에서 계속 내리므로 URL 대신 묶음 번호를 넘김
+    return await crawl_pages(
+        name, first, str, lambda i: load_more(int(i)), replace(opts, parallel=1), accept,
+    )
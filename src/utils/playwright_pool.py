@@ -1,21 +1,129 @@
 ﻿from __future__ import annotations
+import asyncio
+import time
 from contextlib import asynccontextmanager
-from playwright.async_api import async_playwright
+from typing import AsyncIterator, Optional
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+from src.utils.http_pool import USER_AGENT
+from src.utils.logging import log
+from src.utils.net_block import BlockProfile, RequestBlocker
+from src.utils.metrics import METRICS, span
+
+
+class BrowserPool:
+    """
+    프로세스 전체에서 Chromium 하나를 띄워두고, 요청마다 격리된 context를 임대(lease)해준다.
+    - 브라우저 실행은 start()에서 한 번만 (죽어 있으면 다음 lease 때 재실행)
+    - 동시에 열 수 있는 context 수는 max_contexts로 제한
+    """
+
+    def __init__(self, headless: bool = True, max_contexts: int = 4):
+        self.headless = headless
+        self.max_contexts = max(1, int(max_contexts))
+        self._pw: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.max_contexts)
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self.started:
+                return
+            if self._pw is None:
+                self._pw = await async_playwright().start()
+            with span("browser", "launch"):
+                self._browser = await self._pw.chromium.launch(headless=self.headless)
+
+            # ✅ 워밍업: 첫 context/page 생성 비용을 미리 치러둔다
+            ctx = await self._new_context()
+            try:
+                page = await ctx.new_page()
+                await page.goto("about:blank")
+            finally:
+                await ctx.close()
+
+    async def stop(self) -> None:
+        async with self._lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception:
+                    pass
+                self._browser = None
+            if self._pw is not None:
+                try:
+                    await self._pw.stop()
+                except Exception:
+                    pass
+                self._pw = None
+
+    async def _new_context(self) -> BrowserContext:
+        assert self._browser is not None
+        return await self._browser.new_context(locale="ko-KR", user_agent=USER_AGENT)
+
+    @asynccontextmanager
+    async def lease(self, name: str = "browser") -> AsyncIterator[BrowserContext]:
+        t0 = time.perf_counter()
+        async with self._slots:
+            # 다른 쿼리가 context를 다 쓰고 있어서 기다린 시간
+            METRICS.observe("stage_seconds", time.perf_counter() - t0, provider=name, stage="slot_wait")
+            await self.start()
+            with span(name, "new_context"):
+                context = await self._new_context()
+            try:
+                yield context
+            finally:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+
+
+_pool: Optional[BrowserPool] = None
+
+
+def get_pool(headless: bool = True) -> BrowserPool:
+    """공유 풀을 돌려준다. 아직 없으면 기본 설정으로 만든다 (브라우저는 첫 lease 때 실행)."""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool(headless=headless)
+    return _pool
+
+
+async def start_pool(headless: bool = True, max_contexts: int = 4) -> BrowserPool:
+    """run_once / 봇 시작 시 호출: 풀을 만들고 Chromium을 미리 띄운다."""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool(headless=headless, max_contexts=max_contexts)
+    await _pool.start()
+    return _pool
+
+
+async def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+
 
 @asynccontextmanager
-async def browser_context(headless: bool = True):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        context = await browser.new_context(
-            locale="ko-KR",
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122.0.0.0 Safari/537.36"
-            ),
-        )
+async def browser_context(
+    headless: bool = True,
+    block: Optional[BlockProfile] = None,
+) -> AsyncIterator[BrowserContext]:
+    # 기존 호출부 호환용: 매번 브라우저를 띄우지 않고 공유 풀에서 context만 빌려온다
+    async with get_pool(headless=headless).lease(block.name if block else "browser") as context:
+        blocker = None
+        if block is not None and block.enabled:
+            # ✅ 이미지/폰트/광고 등 불필요한 요청은 여기서 abort
+            blocker = RequestBlocker(block)
+            await blocker.install(context)
         try:
             yield context
         finally:
-            await context.close()
-            await browser.close()
+            if blocker is not None:
+                log(f"[{block.name}] net {blocker.finish().summary()}")
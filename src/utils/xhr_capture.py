@@ -0,0 +1,129 @@
+from __future__ import annotations
+import asyncio
+import re
+from typing import Any, Callable, List, Optional, Sequence
+from playwright.async_api import Page, Response
+from src.providers.base import Listing
+
+
+def dig(obj: Any, *path: Any) -> Any:
+    """중첩 dict/list에서 안전하게 값을 꺼낸다. 중간에 없으면 None."""
+    for key in path:
+        if obj is None:
+            return None
+        if isinstance(key, int):
+            if not isinstance(obj, list) or len(obj) <= key:
+                return None
+            obj = obj[key]
+        else:
+            if not isinstance(obj, dict):
+                return None
+            obj = obj.get(key)
+    return obj
+
+
+def find_list(obj: Any, names: Sequence[str], max_depth: int = 6) -> List[dict]:
+    """names 중 하나의 키 아래에 있는 dict 리스트를 너비 우선으로 찾는다 (API 스키마 변화 대비)."""
+    queue = [(obj, 0)]
+    while queue:
+        cur, depth = queue.pop(0)
+        if isinstance(cur, dict):
+            for k, v in cur.items():
+                if k in names and isinstance(v, list) and v and isinstance(v[0], dict):
+                    return v
+                if depth < max_depth and isinstance(v, (dict, list)):
+                    queue.append((v, depth + 1))
+        elif isinstance(cur, list) and depth < max_depth:
+            queue.extend((v, depth + 1) for v in cur[:50] if isinstance(v, (dict, list)))
+    return []
+
+
+def first(*values: Any) -> Any:
+    """None/빈 문자열이 아닌 첫 값"""
+    for v in values:
+        if v is not None and v != "":
+            return v
+    return None
+
+
+def to_int(v: Any) -> Optional[int]:
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return int(round(v))
+    m = re.search(r"\d[\d,]*", str(v))
+    return int(m.group(0).replace(",", "")) if m else None
+
+
+def to_float(v: Any) -> Optional[float]:
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    m = re.search(r"\d+(?:\.\d+)?", str(v))
+    return float(m.group(0)) if m else None
+
+
+class ResponseCapture:
+    """
+    page.on("response")로 검색 API(JSON) 응답을 잡아 바로 Listing으로 디코딩한다.
+    - patterns: URL에 포함되면 후보로 보는 문자열들
+    - decode: JSON → List[Listing] (못 읽으면 빈 리스트)
+    첫 번째로 비어있지 않은 디코딩 결과가 나오면 wait()가 즉시 반환된다.
+    그 뒤 응답(무한 스크롤로 불러온 다음 묶음)도 batches에 쌓임 → wait_batch(n)
+    """
+
+    def __init__(self, patterns: Sequence[str], decode: Callable[[Any], List[Listing]]):
+        self.patterns = tuple(patterns)
+        self.decode = decode
+        self.matched = 0
+        self.batches: List[List[Listing]] = []
+        self._done: "asyncio.Future[List[Listing]]" = asyncio.get_running_loop().create_future()
+        self._more = asyncio.Event()
+
+    def attach(self, page: Page) -> None:
+        page.on("response", self._on_response)
+
+    def _matches(self, url: str) -> bool:
+        return any(p in url for p in self.patterns)
+
+    async def _on_response(self, response: Response) -> None:
+        if not self._matches(response.url):
+            return
+        if response.status != 200:
+            return
+        if "json" not in response.headers.get("content-type", ""):
+            return
+        self.matched += 1
+        try:
+            data = await response.json()
+            listings = self.decode(data)
+        except Exception:
+            return
+        if not listings:
+            return
+        self.batches.append(listings)
+        self._more.set()
+        if not self._done.done():
+            self._done.set_result(listings)
+
+    async def wait(self, timeout_ms: int) -> List[Listing]:
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._done), timeout=timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            return []
+
+    async def wait_batch(self, n: int, timeout_ms: int) -> List[Listing]:
+        """n번째(0부터) 비어있지 않은 응답. timeout_ms 안에 안 오면 빈 리스트"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_ms / 1000
+        while len(self.batches) <= n:
+            left = deadline - loop.time()
+            if left <= 0:
+                return []
+            self._more.clear()
+            try:
+                await asyncio.wait_for(self._more.wait(), timeout=left)
+            except asyncio.TimeoutError:
+                return []
+        return self.batches[n]
@@ -0,0 +1,10 @@
+import asyncio
+from src.app.runner import run_watch
+
+if __name__ == "__main__":
+    asyncio.run(run_watch())
+
+# 상시 감시 모드 (프로젝트 루트에서)
+# python -m src.watch
+# 쿼리별 주기는 settings.yaml의 schedule / queries[].interval_min
+# 취소는 ctrl + c